@@ -0,0 +1,255 @@
+"""
+helper module to read and write "image68" memory images, either in the legacy text format or in its binary variant.
+
+The legacy text format is a list of records, one per line:
+    - C{1<addr>}: start address of the following data records
+    - C{0<data>}: 64-bit data record, the address being incremented by 8 after each of them
+    - C{2<zero>}: end of a group of records (memory init, then tag init)
+
+The binary variant stores the same content as a list of sections, each holding the runs of contiguous 64-bit words
+of one kind (data or tag) for one security space:
+    - file header: C{<8sII} magic, version, number of sections
+    - section header: C{<IIQQQ} kind, space, address mask, number of runs, number of words
+    - run table: C{<QQ} address and number of words of each run
+    - payload: C{<Q} words of all the runs of the section, in run order
+
+The address mask of a section holds the security space bits that are ORed into the address records when converting
+the section back to text. A C{2} record is emitted after each group of consecutive sections of the same kind.
+"""
+
+from struct import pack, unpack_from, calcsize
+
+import numpy as np
+
+IMAGE68_MAGIC = b"IMAGE68\0"
+IMAGE68_VERSION = 1
+
+IMAGE68_HEADER = "<8sII"
+IMAGE68_SECTION_HEADER = "<IIQQQ"
+
+SECTION_DATA = 0
+SECTION_TAG = 1
+
+# security space of a section, as the value of its NSE and NS address bits
+SPACE_SECURE = 0b00
+SPACE_NON_SECURE = 0b01
+SPACE_ROOT = 0b10
+SPACE_REALM = 0b11
+
+# every byte value mapped to its two lower case hex digits (as ASCII codes)
+HEX_PAIRS = np.frombuffer(b"".join(b"%02x" % value for value in range(256)), dtype=np.uint8).reshape(256, 2)
+
+# maximum number of records formatted at once, to bound the size of the temporary text buffers
+RECORDS_PER_CHUNK = 1 << 16
+
+class Image68Section:
+    "runs of contiguous 64-bit words of one kind for one security space"
+
+    def __init__(self, kind, space, mask=0, runs=None):
+        """
+        @param kind: L{SECTION_DATA} or L{SECTION_TAG}
+        @param space: security space of the section (SPACE_*)
+        @param mask: address bits ORed into the address records when converting to text
+        @param runs: list of (address, words) tuples, words being a uint64 array
+        """
+        self.kind = kind
+        self.space = space
+        self.mask = mask
+        self.runs = [] if runs is None else runs
+
+    def add_run(self, address, words):
+        "append a run of words starting at L{address}"
+        self.runs.append((address, words))
+
+    def get_word_count(self):
+        "return the total number of words in the section"
+        return sum(len(words) for _, words in self.runs)
+
+def get_record_lines(values, prefix=None):
+    """
+    return the image68 text records of a uint64 array as a (records, characters) uint8 array
+
+    @param prefix: record type character preceding the 16 hex digits, if any
+    """
+    offset = 0 if prefix is None else 1
+    lines = np.empty((len(values), offset + 17), dtype=np.uint8)
+    if prefix is not None:
+        lines[:, 0] = ord(prefix)
+    lines[:, offset:offset + 16] = HEX_PAIRS[np.asarray(values, dtype=np.uint64).astype(">u8").view(np.uint8)].reshape(-1, 16)
+    lines[:, -1] = ord("\n")
+    return lines
+
+def get_word_lines(words, kind=SECTION_DATA):
+    """
+    return the image68 text records of the words of a section as a (records, characters) uint8 array
+
+    Data records are C{0} followed by 16 hex digits. Tag records only hold 16 hex digits whose first one is the
+    (always zero) top nibble of the duplicated tag, as in C{"0{:015x}"}.
+    """
+    return get_record_lines(words, "0" if kind == SECTION_DATA else None)
+
+def format_records(words, kind=SECTION_DATA):
+    "return the image68 text records of a uint64 array as a string"
+    return get_word_lines(words, kind).tobytes().decode("ascii")
+
+def format_runs(addresses, run_lengths, words, kind=SECTION_DATA):
+    """
+    return the image68 text records of consecutive runs as a string, each run being preceded by its address record,
+    see L{write_runs} to write many runs with a bounded memory usage
+
+    @param addresses: uint64 array of the start address of each run
+    @param run_lengths: number of words of each run
+    @param words: uint64 array of the words of all the runs, in run order
+    """
+    address_lines = get_record_lines(addresses, "1")
+    word_lines = get_word_lines(words, kind)
+    run_lengths = np.asarray(run_lengths, dtype=np.int64)
+    words_before = np.cumsum(run_lengths) - run_lengths
+
+    address_offsets = np.arange(len(run_lengths)) * address_lines.shape[1] + words_before * word_lines.shape[1]
+    word_runs = np.repeat(np.arange(len(run_lengths)), run_lengths)
+    word_offsets = (word_runs + 1) * address_lines.shape[1] + np.arange(len(words)) * word_lines.shape[1]
+
+    text = np.empty(address_lines.size + word_lines.size, dtype=np.uint8)
+    text[address_offsets[:, None] + np.arange(address_lines.shape[1])] = address_lines
+    text[word_offsets[:, None] + np.arange(word_lines.shape[1])] = word_lines
+    return text.tobytes().decode("ascii")
+
+def write_runs(fd, addresses, run_lengths, words, kind=SECTION_DATA):
+    """
+    write the image68 text records of consecutive runs to L{fd}, each run being preceded by its address record, by
+    chunks of about L{RECORDS_PER_CHUNK} records
+
+    @param addresses: uint64 array of the start address of each run
+    @param run_lengths: number of words of each run
+    @param words: uint64 array of the words of all the runs, in run order
+    """
+    run_lengths = np.asarray(run_lengths, dtype=np.int64)
+    words_end = np.cumsum(run_lengths)
+    run_index = 0
+    while run_index < len(run_lengths):
+        words_start = int(words_end[run_index] - run_lengths[run_index])
+        if run_lengths[run_index] > RECORDS_PER_CHUNK:
+            # a long run is written on its own, its words by chunks
+            fd.write("1{0:016x}\n".format(int(addresses[run_index])))
+            write_records(fd, words[words_start:words_end[run_index]], kind)
+            run_index += 1
+            continue
+        # as many whole runs as fit in one chunk
+        next_index = int(np.searchsorted(words_end, words_start + RECORDS_PER_CHUNK, side="right"))
+        fd.write(format_runs(addresses[run_index:next_index], run_lengths[run_index:next_index],
+                             words[words_start:words_end[next_index - 1]], kind))
+        run_index = next_index
+
+def repeat_word(word, count):
+    "return a read-only uint64 array of L{count} times L{word}, without allocating them"
+    return np.broadcast_to(np.uint64(word), (count,))
+
+def write_records(fd, words, kind=SECTION_DATA):
+    "write the image68 text records of a uint64 array to L{fd}, by chunks"
+    if len(words) and words.strides == (0,):
+        # repeated word (see L{repeat_word}), the same record is written over and over
+        record = format_records(words[:1], kind)
+        for offset in range(0, len(words), RECORDS_PER_CHUNK):
+            fd.write(record * min(RECORDS_PER_CHUNK, len(words) - offset))
+        return
+    for offset in range(0, len(words), RECORDS_PER_CHUNK):
+        fd.write(format_records(words[offset:offset + RECORDS_PER_CHUNK], kind))
+
+def write_end_record(fd):
+    "write the record terminating a group of image68 text records"
+    fd.write("2{0:016x}\n".format(0))
+
+def write_text(fd, sections):
+    "write L{sections} to the text file L{fd} in the legacy image68 format"
+    for index, section in enumerate(sections):
+        for address, words in section.runs:
+            fd.write("1{0:016x}\n".format(address | section.mask))
+            write_records(fd, words, section.kind)
+        if index + 1 == len(sections) or sections[index + 1].kind != section.kind:
+            write_end_record(fd)
+
+def write_binary(fd, sections):
+    "write L{sections} to the binary file L{fd} in the binary image68 format"
+    fd.write(pack(IMAGE68_HEADER, IMAGE68_MAGIC, IMAGE68_VERSION, len(sections)))
+    for section in sections:
+        fd.write(pack(IMAGE68_SECTION_HEADER,
+                      section.kind,
+                      section.space,
+                      section.mask,
+                      len(section.runs),
+                      section.get_word_count()))
+        fd.write(np.array([(address, len(words)) for address, words in section.runs], dtype="<u8").tobytes())
+        for _, words in section.runs:
+            for offset in range(0, len(words), RECORDS_PER_CHUNK):
+                fd.write(np.asarray(words[offset:offset + RECORDS_PER_CHUNK], dtype="<u8").tobytes())
+
+def is_binary(fd):
+    "return True if the buffered binary file L{fd} starts with a binary image68 header, without consuming it"
+    return fd.peek(len(IMAGE68_MAGIC))[:len(IMAGE68_MAGIC)] == IMAGE68_MAGIC
+
+def read_binary(fd):
+    "return the list of L{Image68Section} stored in the binary file L{fd}"
+    data = fd.read()
+    magic, version, section_count = unpack_from(IMAGE68_HEADER, data)
+    if magic != IMAGE68_MAGIC:
+        raise ValueError("not a binary image68 file")
+    if version != IMAGE68_VERSION:
+        raise ValueError("unsupported binary image68 version {}".format(version))
+
+    offset = calcsize(IMAGE68_HEADER)
+    sections = []
+    for _ in range(section_count):
+        kind, space, mask, run_count, word_count = unpack_from(IMAGE68_SECTION_HEADER, data, offset)
+        offset += calcsize(IMAGE68_SECTION_HEADER)
+        run_table = np.frombuffer(data, dtype="<u8", count=2 * run_count, offset=offset).reshape(-1, 2)
+        offset += 16 * run_count
+        payload = np.frombuffer(data, dtype="<u8", count=word_count, offset=offset)
+        offset += 8 * word_count
+
+        section = Image68Section(kind, space, mask)
+        run_offset = 0
+        for address, run_word_count in run_table.tolist():
+            section.add_run(address, payload[run_offset:run_offset + run_word_count])
+            run_offset += run_word_count
+        sections.append(section)
+    return sections
+
+def read_text(fd, ns_bit_position):
+    """
+    return the list of L{Image68Section} of a legacy image68 text file
+
+    The first group of records is read as data, the following ones as tags. The security space bits are moved from
+    the address records to the section masks.
+
+    @param ns_bit_position: position of the NS bit in the address records (NSE being the next one)
+    """
+    space_mask = 0b11 << ns_bit_position
+    sections = []
+    kind = SECTION_DATA
+    address = None
+    words = []
+
+    def flush_run():
+        if address is not None:
+            sections[-1].add_run(address, np.array(words, dtype=np.uint64))
+
+    for line in fd:
+        if line[0] == '1':
+            flush_run()
+            raw_address = int(line[1:], 16)
+            mask = raw_address & space_mask
+            if not sections or (sections[-1].kind, sections[-1].mask) != (kind, mask):
+                sections.append(Image68Section(kind, mask >> ns_bit_position, mask))
+            address = raw_address & ~space_mask
+            words = []
+        elif line[0] == '2':
+            flush_run()
+            if not sections or sections[-1].kind != kind:
+                sections.append(Image68Section(kind, SPACE_SECURE))
+            address = None
+            kind = SECTION_TAG
+        else:
+            words.append(int(line, 16))
+    flush_run()
+    return sections
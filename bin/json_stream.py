@@ -0,0 +1,107 @@
+"""
+helper module to read a JSON document incrementally, one value at a time, without building the whole tree.
+"""
+
+import json
+import re
+
+# number of characters read at once from the JSON file
+JSON_CHUNK_SIZE = 1 << 20
+
+JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# characters a number can go on with, decoding a number followed by them up to the end of the buffer may only
+# return its beginning (e.g. 1 for 1.5 split as "1." and "5")
+JSON_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+class JsonStream:
+    """
+    Incremental reader of a JSON document.
+
+    Objects and arrays can be walked one member at a time with L{iter_object} and L{iter_array}, so that only the
+    value being decoded by L{read_value} is held in memory.
+    """
+
+    def __init__(self, fd, chunk_size=JSON_CHUNK_SIZE):
+        self.fd = fd
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def read_more(self):
+        "append a chunk (at least as large as the pending data) to the buffer, return False at the end of the file"
+        if self.eof:
+            return False
+        chunk = self.fd.read(max(self.chunk_size, len(self.buffer) - self.position))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+
+    def peek(self):
+        "return the next non whitespace character without consuming it, an empty string at the end of the file"
+        while True:
+            self.position = JSON_WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.read_more():
+                return ""
+
+    def expect(self, chars):
+        "consume the next non whitespace character, which must be one of L{chars}, and return it"
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError("expected one of {!r} in JSON file, got {!r}".format(chars, char))
+        self.position += 1
+        return char
+
+    def is_complete(self, value, end):
+        "return True if the L{value} decoded up to L{end} cannot go on in the next chunk"
+        if self.eof:
+            return True
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return end < len(self.buffer)
+        # a number is only complete once followed by a delimiter
+        return JSON_NUMBER_TAIL.match(self.buffer, end).end() < len(self.buffer)
+
+    def read_value(self):
+        "decode and return the value at the current position"
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                if self.is_complete(value, end):
+                    self.position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+    def iter_object(self):
+        "iterate over the keys of the object at the current position, the caller having to consume each value"
+        self.expect("{")
+        if self.peek() == "}":
+            self.position += 1
+            return
+        while True:
+            key = self.read_value()
+            self.expect(":")
+            yield key
+            if self.expect(",}") == "}":
+                return
+
+    def iter_array(self):
+        "iterate over the elements of the array at the current position, the caller having to consume each of them"
+        self.expect("[")
+        if self.peek() == "]":
+            self.position += 1
+            return
+        while True:
+            yield
+            if self.expect(",]") == "]":
+                return
@@ -7,15 +7,19 @@ import pathlib
 import os
 import json
 import glob
-from datetime import datetime, timedelta
-from typing import List, Dict, ByteString, Optional
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Dict, ByteString, Optional, Tuple
 import ast
+import hashlib
+import importlib.util
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 
+import numpy as np
 import pandas as pd
 import joblib
 
-from distributed import Client, worker_client
+from distributed import Client, get_worker, worker_client
 
 import prefect
 from prefect import task, Flow
@@ -36,6 +40,21 @@ from popeye_ml.popeye_dory_interface import PopeyeDoryInterface
 
 logger = dory.utilities.logging.configure_logging()
 
+# Number of popeye json files parsed by one dask task.
+JSON_BATCH_SIZE = 500
+
+# File of the json directory caching the parsed rows of each popeye json file, keyed by path.
+JSON_CACHE_FILE = ".jsons_to_df.cache.pkl"
+
+# Number of EAP attachments decompressed by one dask task.
+ATTACHMENT_BATCH_SIZE = 200
+
+# Number of days fetched from EAP at the same time.
+EAP_FETCH_WORKERS = 4
+
+# The engines pandas can read and write the cached EAP partitions with.
+PARQUET_ENGINES = ("pyarrow", "fastparquet")
+
 def parse_args():
     """parse cli args"""
     parser = argparse.ArgumentParser(
@@ -122,6 +141,15 @@ def parse_args():
         default=None,
         type=str
     )
+    parser.add_argument(
+        "--eap-cache-dir",
+        help=(
+            "Directory caching the EAP data of each past day of the training window, "
+            "so that only new days are fetched. Defaults to eap_cache in the output directory."
+        ),
+        default=None,
+        type=str
+    )
 
     dask_grp = parser.add_argument_group("dask options", "control dask resource usage")
     dask_grp.add_argument(
@@ -214,72 +242,161 @@ def parse_args():
     opts.fetch_train_from_date = datetime.strptime(opts.fetch_train_from_date , "%Y%m%d").date()
     opts.fetch_train_to_date = datetime.strptime(opts.fetch_train_to_date, "%Y%m%d").date()
     opts.fetch_train_usertag = ast.literal_eval(opts.fetch_train_usertag)
+    if not any(importlib.util.find_spec(engine) for engine in PARQUET_ENGINES):
+        if opts.eap_cache_dir is not None:
+            parser.error(f"--eap-cache-dir needs one of the {' or '.join(PARQUET_ENGINES)} packages")
+        logger.warning(f"No {' or '.join(PARQUET_ENGINES)} package, the EAP data will not be cached")
+    elif opts.eap_cache_dir is None:
+        opts.eap_cache_dir = os.path.join(opts.output, "eap_cache")
 
     return opts
 
 
-def load_popeye_json_configs(json_files: List[str]) -> Dict:
+def load_popeye_json_row(path: str, fields: Optional[List[str]] = None) -> Optional[Dict]:
     """
-    Load json files from list of files.
-    Return dictionary like so:
-    output dictionary
-    {
-        <seed>: <config>,
-        <seed>: <config>
-        ...
-    }
-    :param json_files: List of strings containing file names
-    :type json_files: list
-    :return ret: Config dictionary from json
-    :type ret: Dictionary
-    :return fails: Fail info from json
-    :type fails: Dictionary
+    Load one json file and flatten the part of it used for candidate scoring.
+    :param path: Path of the popeye json file
+    :param fields: Flattened config fields to keep, all of them if None
+    :return row: Flat config with fail, seed, build_options and command, None if the file is empty
     """
 
-    ret = {}
-    for path in json_files:
-        with open(path, "r") as fd:
-            json_dict = json.load(fd)
+    with open(path, "r") as fd:
+        json_dict = json.load(fd)
 
-        if not json_dict:
-            logger.info(f"{path} could not be loaded")
-            continue
+    if not json_dict:
+        return None
 
-        ret[json_dict["stats"]["global"]["seed"]] = {
-            "seed": json_dict["stats"]["global"]["seed"],
-            "fail": 1 if "FAIL" in path else 0, "config": json_dict["config"],
-            "build_options": json_dict["stats"]["global"]["build_options"],
-            "command": json_dict["stats"]["global"]["command"]
-        }
+    row = flatten_dict(json_dict["config"], sep="")
+    if fields is not None:
+        fields = set(fields)
+        row = {key: value for key, value in row.items() if key in fields}
+    row["fail"] = 1 if "FAIL" in path else 0
+    row["seed"] = json_dict["stats"]["global"]["seed"]
+    row["build_options"] = json_dict["stats"]["global"]["build_options"]
+    row["command"] = json_dict["stats"]["global"]["command"]
+
+    return row
+
+
+def load_popeye_json_rows(paths: List[str], fields: Optional[List[str]] = None) -> List[Optional[Dict]]:
+    """
+    Load a batch of json files, this runs on a dask worker.
+    :param paths: Paths of the popeye json files
+    :param fields: Flattened config fields to keep, all of them if None
+    :return rows: Rows of load_popeye_json_row, in the order of paths
+    """
+
+    return [load_popeye_json_row(path, fields) for path in paths]
+
+
+def map_batches(func: Callable, items: List, batch_size: int, **kwargs) -> List:
+    """
+    Run a function over batches of items on the dask workers, or serially when not running on a cluster.
+    :param func: Function taking a list of items and returning the list of their results
+    :param items: Items to process
+    :param batch_size: Number of items given to one call of func
+    :return results: Results of all the items, in order
+    """
+
+    try:
+        get_worker()
+    except ValueError:
+        return func(items, **kwargs)
+
+    batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+    with worker_client() as client:
+        futures = client.map(func, batches, pure=False, **kwargs)
+        return [result for results in client.gather(futures) for result in results]
+
+
+def parse_popeye_jsons(paths: List[str], fields: Optional[List[str]] = None) -> List[Optional[Dict]]:
+    """
+    Load json files in batches on the dask workers, or serially when not running on a cluster.
+    :param paths: Paths of the popeye json files
+    :param fields: Flattened config fields to keep, all of them if None
+    :return rows: Rows of load_popeye_json_row, in the order of paths
+    """
 
-    return ret
+    return map_batches(load_popeye_json_rows, paths, JSON_BATCH_SIZE, fields=fields)
 
 
 @task()
-def jsons_to_df(json_dir: str) -> pd.DataFrame:
+def get_training_fields(df_train: pd.DataFrame) -> List[str]:
+    """Task returning the columns of the training data, the only config fields the candidates need.
+
+    :param df_train: The training data.
+    :return: The sorted column names.
+    """
+    return sorted(df_train.columns)
+
+
+def get_file_digest(path: str) -> str:
+    """
+    Return the sha1 of the content of a file.
+    :param path: Path of the file
+    :return digest: Hex digest of the file content
+    """
+
+    with open(path, "rb") as fd:
+        return hashlib.sha1(fd.read()).hexdigest()
+
+
+@task()
+def jsons_to_df(json_dir: str, fields: Optional[List[str]] = None, cache_dir: Optional[str] = None,
+                csvfile: Optional[str] = None) -> pd.DataFrame:
     """
     Convert JSON file to dataframe.
+    Files are parsed in parallel and their rows are cached, keyed by file path and content, so that
+    only new or changed files are parsed again, the json directory being regenerated on every run.
     :param json_dir: Path location to pick json files from
+    :param fields: Flattened config fields to keep, all of them if None
+    :param cache_dir: Directory of the parsed rows cache, nothing is cached if None
+    :param csvfile: If provided, the dataframe is also written to a file with this name
     :return df: Output dataframe
     """
 
     files = glob.glob(str(json_dir) + "/popeye_elf*.json")
 
-    config_dict = load_popeye_json_configs(files)
-
-    flat_configs = {}
-    for kconfig in config_dict:
-        flat_configs[kconfig] = flatten_dict(config_dict[kconfig]["config"], sep="")
-        flat_configs[kconfig]["fail"] = config_dict[kconfig]["fail"]
-        flat_configs[kconfig]["seed"] = config_dict[kconfig]["seed"]
-        flat_configs[kconfig]["build_options"] = config_dict[kconfig]["build_options"]
-        flat_configs[kconfig]["command"] = config_dict[kconfig]["command"]
+    cache_file = pathlib.Path(cache_dir) / JSON_CACHE_FILE if cache_dir else None
+    cache = {}
+    if cache_file is not None and cache_file.exists():
+        try:
+            cache = joblib.load(cache_file)
+        except Exception:  # pylint: disable=broad-except
+            logger.info(f"{cache_file} could not be loaded, parsing all json files")
+        if cache.get("fields") != fields:
+            cache = {}
+    cached_rows = cache.get("rows", {})
+
+    keys = {path: (path, get_file_digest(path)) for path in files}
+    rows = {keys[path]: cached_rows[keys[path]] for path in files if keys[path] in cached_rows}
+    stale = [path for path in files if keys[path] not in rows]
+
+    logger.info(f"Parsing {len(stale)} of {len(files)} json files")
+    for path, row in zip(stale, parse_popeye_jsons(stale, fields)):
+        rows[keys[path]] = row
+
+    # only the rows of the current files are kept, so that the cache does not grow from run to run
+    if cache_file is not None and (stale or len(rows) != len(cached_rows)):
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        joblib.dump({"fields": fields, "rows": rows}, tmp_file)
+        os.replace(tmp_file, cache_file)
+
+    # Keyed by seed, a later file of the same seed replacing the earlier one.
+    seed_rows = {}
+    for path in files:
+        row = rows[keys[path]]
+        if row is None:
+            logger.info(f"{path} could not be loaded")
+            continue
+        seed_rows[row["seed"]] = row
 
-    df = pd.DataFrame(flat_configs).T
-    df["seed"] = df.index
-    df = df.reset_index(drop=True)
+    # Built row by row from the flat dicts, so that each column gets its own dtype.
+    df = pd.DataFrame(list(seed_rows.values()))
 
-    df.to_csv("generated.csv")
+    if csvfile:
+        df.to_csv(csvfile)
 
     return df
 
@@ -331,13 +448,175 @@ def training_subsample(data: pd.DataFrame, num: int, csvfile: Optional[str]=None
     return sampled
 
 
-@task
-def get_table_data(opts: argparse.Namespace, eap: EAPInterfaceS3) -> pd.DataFrame:
-    """This task retrieves the tabular data for the training window.
+def extract_attachment_configs(attachments: List[Tuple[Tuple, Dict[str, ByteString]]]) -> List[Dict]:
+    """Decompress a batch of attachments and extract their popeye config, this runs on a dask worker.
+
+    :param attachments: The (key, attachment files) items of the attachments.
+    :return: The popeye configs, in the order of attachments.
+    """
+    return [
+        json.loads(zlib.decompress(value['popeye.json.gz'], 16 + zlib.MAX_WBITS).decode())["config"]
+        for _, value in attachments
+    ]
+
+
+class EAPDailyPartitions:
+    """The filtered EAP table rows and popeye configs of each day, cached locally as Parquet files.
+
+    The table rows and the configs of a day are cached separately: all the table rows of a day
+    are fetched at once, while attachments are only fetched for the rows whose configs are asked
+    for (e.g. the subsampled training rows), the configs cached for a day growing as new rows are
+    asked for. Only the days that have ended are cached, keyed by date and user regression tags, so
+    that moving the training window forward only fetches the new days.
+
+    :param opts: Options holding the user regression tags to filter on.
+    :param eap: The EAP data loader, anything providing the get_sets and attachments_from_rows
+        methods of EAPInterfaceS3.
+    :param cache_dir: Directory of the cached partitions, nothing is cached if None.
+    """
+
+    def __init__(self, opts: argparse.Namespace, eap: EAPInterfaceS3, cache_dir: Optional[str]):
+        self.opts = opts
+        self.eap = eap
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else None
+        self.usertag_key = hashlib.sha1(json.dumps(sorted(opts.fetch_train_usertag)).encode()).hexdigest()[:12]
+        self.tables = {}
+
+    def get_paths(self, date) -> Tuple[pathlib.Path, pathlib.Path]:
+        """Return the table and configs Parquet files of a day."""
+        prefix = f"{date:%Y%m%d}_{self.usertag_key}"
+        return (self.cache_dir / f"{prefix}.table.parquet", self.cache_dir / f"{prefix}.configs.parquet")
+
+    def get_cached_path(self, date, index: int) -> Optional[pathlib.Path]:
+        """Return the table (index 0) or configs (index 1) Parquet file of a day, None if not cached."""
+        if self.cache_dir is None:
+            return None
+        path = self.get_paths(date)[index]
+        return path if path.exists() else None
+
+    def write(self, date, frame: pd.DataFrame, path: pathlib.Path) -> None:
+        """Write a frame of a day to the cache, if the day has ended (EAP dates being UTC)."""
+        if date >= datetime.now(timezone.utc).date():
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            frame.to_parquet(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as ex:  # pylint: disable=broad-except
+            # e.g. the pyarrow errors raised by object columns of mixed types, training goes on uncached
+            logger.warning(f"EAP data of {date} could not be cached in {path}: {ex}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+
+    def read_table(self, path: pathlib.Path) -> pd.DataFrame:
+        """Read the table rows of a day from the cache."""
+        table = pd.read_parquet(path)
+        # Parquet reads list cells back as arrays, turn them back into the lists EAP returns
+        for column in table.columns[table.dtypes == object]:
+            table[column] = [value.tolist() if isinstance(value, np.ndarray) else value for value in table[column]]
+        return table
+
+    def read_configs(self, date) -> Dict:
+        """Read the configs of a day from the cache, keyed by (sid, rid), empty if none are cached."""
+        path = self.get_cached_path(date, 1)
+        if path is None:
+            return {}
+        configs_df = pd.read_parquet(path)
+        return {
+            (sid, rid): json.loads(config)
+            for sid, rid, config in zip(configs_df["sid"], configs_df["rid"], configs_df["config"])
+        }
+
+    def write_configs(self, date, configs: Dict) -> None:
+        """Write the configs of a day, keyed by (sid, rid), to the cache."""
+        if self.cache_dir is None:
+            return
+        keys = list(configs)
+        configs_df = pd.DataFrame({
+            "sid": [key[0] for key in keys],
+            "rid": [key[1] for key in keys],
+            "config": [json.dumps(configs[key]) for key in keys],
+        })
+        self.write(date, configs_df, self.get_paths(date)[1])
+
+    def fetch_table(self, date) -> pd.DataFrame:
+        """Fetch the table rows of a day from EAP and filter them."""
+        data = self.eap.get_sets(
+            date, date + timedelta(days=1) # , payload="popeye"
+        )
+        return filter_data(self.opts, data, f".{date:%Y%m%d}")
+
+    def fetch_attachments(self, rows: pd.DataFrame) -> Dict[Tuple, Dict[str, ByteString]]:
+        """Fetch the compressed attachments of table rows from EAP, keyed by (sid, rid)."""
+        if rows.empty:
+            return {}
+        return self.eap.attachments_from_rows(rows, pattern=r"popeye\.json\.gz")
+
+    def get_table(self, dates: List) -> pd.DataFrame:
+        """Return the table rows of a list of days, fetching the days missing from the cache concurrently.
+
+        :param dates: The days to return.
+        :return: The concatenated table rows.
+        """
+        for date in dates:
+            path = self.get_cached_path(date, 0)
+            if path is not None:
+                self.tables[date] = self.read_table(path)
+        missing = [date for date in dates if date not in self.tables]
+        logger.info(f"Fetching the table rows of {len(missing)} of {len(dates)} days from EAP")
+
+        with ThreadPoolExecutor(max_workers=EAP_FETCH_WORKERS) as executor:
+            for date, data in zip(missing, executor.map(self.fetch_table, missing)):
+                if self.cache_dir is not None:
+                    self.write(date, data, self.get_paths(date)[0])
+                self.tables[date] = data
+
+        return pd.concat([self.tables[date] for date in dates])
+
+    def get_configs(self, table_data: pd.DataFrame) -> Dict:
+        """Return the configs of table rows read by get_table, fetching those missing from the cache.
+
+        The attachments of the missing configs are downloaded concurrently, one day per thread, and
+        decompressed on the dask workers.
+
+        :param table_data: The table rows, e.g. a subsample of those returned by get_table.
+        :return: The configs keyed by (sid, rid).
+        """
+        keys = set(zip(table_data.sid, table_data.rid))
+        day_configs = {}
+        missing_rows = {}
+        for date, table in self.tables.items():
+            day_configs[date] = self.read_configs(date)
+            table_keys = pd.MultiIndex.from_arrays([table.sid, table.rid])
+            missing_keys = [key for key in keys.intersection(table_keys) if key not in day_configs[date]]
+            if missing_keys:
+                missing_rows[date] = table.loc[table_keys.isin(missing_keys)]
+        logger.info(f"Fetching the attachments of {sum(map(len, missing_rows.values()))} rows from EAP")
+
+        with ThreadPoolExecutor(max_workers=EAP_FETCH_WORKERS) as executor:
+            dates = list(missing_rows)
+            for date, attachments in zip(dates, executor.map(self.fetch_attachments, missing_rows.values())):
+                items = list(attachments.items())
+                day_configs[date].update(zip(
+                    (key for key, _ in items),
+                    map_batches(extract_attachment_configs, items, ATTACHMENT_BATCH_SIZE),
+                ))
+                self.write_configs(date, day_configs[date])
+
+        configs = {}
+        for date_configs in day_configs.values():
+            configs.update((key, config) for key, config in date_configs.items() if key in keys)
+        return configs
+
+
+@task(nout=2)
+def get_table_data(opts: argparse.Namespace, eap: EAPInterfaceS3) -> Tuple[pd.DataFrame, Dict]:
+    """This task retrieves the tabular data and popeye configs for the training window.
 
     :param opts: Options given on the commandline which define the training window.
     :param eap: An instance of the ML4V EAP data loader.
-    :return: The table data.
+    :return: The table data and the configs keyed by (sid, rid).
     """
     date_list = None
     delta = opts.fetch_train_to_date - opts.fetch_train_from_date
@@ -345,19 +624,15 @@ def get_table_data(opts: argparse.Namespace, eap: EAPInterfaceS3) -> pd.DataFram
         opts.fetch_train_from_date + timedelta(days=i) for i in range(delta.days + 1)
     ]
 
-    dfs = []
-    for date in date_list:
-        data = eap.get_sets(
-            date, date + timedelta(days=1) # , payload="popeye"
-        )
-        data = filter_data(opts, data)
-        dfs.append(data)
-
-    table_data = pd.concat(dfs)
+    partitions = EAPDailyPartitions(opts, eap, opts.eap_cache_dir)
+    table_data = partitions.get_table(date_list)
 
     if opts.training_subsample:
         table_data = training_subsample(table_data, opts.training_subsample, 'subsampled.csv')
 
+    # only the configs of the (subsampled) rows are fetched
+    configs = partitions.get_configs(table_data)
+
     if opts.date_as_sid:
         table_data = table_data.assign(date=table_data.uploadedAt.apply(lambda x: f'{x.year}-{x.month}-{x.day}'))
 
@@ -365,22 +640,18 @@ def get_table_data(opts: argparse.Namespace, eap: EAPInterfaceS3) -> pd.DataFram
         logger.info("error data filtered by get_table_data() is empty!")
         raise ValueError
 
-    return table_data
+    return table_data, configs
 
 
 # This should NOT have the @task decorator; it generates tasks that go in the final flow graph.
-def get_data(opts: argparse.Namespace, table_data: pd.DataFrame, eap: EAPInterfaceS3) -> Task:
-    """This function generates the tasks which will be used to fetch the attachments
-    and create the training data.
+def get_data(opts: argparse.Namespace, table_data: pd.DataFrame, configs: Dict) -> Task:
+    """This function generates the tasks which will be used to create the training data.
 
     :param opts: Options given on the commandline which define the training data.
-    :param table_data: The table data for which the attachments should be fetched.
-    :param eap: An instance of the ML4V EAP data loader.
+    :param table_data: The table data of the training window.
+    :param configs: The popeye configs of the table data, keyed by (sid, rid).
     :return: A task which will generate the training dataset.
     """
-    attachments = eap.attachments_from_rows(table_data, pattern=r"popeye\.json\.gz")
-    configs = process_attachments(attachments)
-
     if opts.keep_intermediates:
         table_data_file = dt.files.dump_pickle(table_data, "get_data.table_data.pkl")
         configs_file = dt.files.dump_pickle(configs, "get_data.cfgs.pkl")
@@ -393,6 +664,26 @@ def get_data(opts: argparse.Namespace, table_data: pd.DataFrame, eap: EAPInterfa
     return training_data
 
 
+def normalize_training_data(data: pd.DataFrame) -> pd.DataFrame:
+    """Convert the list and date cells of the training data to strings, in memory.
+
+    The old workflow wrote the training data to CSV and read it back, turning list cells into
+    their string representation and dates into their text form, which the rest of the
+    application expects. Only those cells are converted here, the other columns keep their
+    dtypes and values (unlike with the CSV round trip, floats are not re-parsed and object
+    columns of mixed types are not turned into strings).
+
+    :param data: The training data.
+    :return: The normalized training data.
+    """
+    for column in data.columns[data.dtypes == object]:
+        if any(isinstance(value, (list, tuple)) for value in data[column]):
+            data[column] = [str(value) if isinstance(value, (list, tuple)) else value for value in data[column]]
+    for column in data.select_dtypes(include=["datetime", "datetimetz"]).columns:
+        data[column] = data[column].astype(str)
+    return data
+
+
 @task
 def build_training_data(dfret: pd.DataFrame, configs: Dict[str,str]) -> pd.DataFrame:
     """A task to build the training data from the raw data in EAP.
@@ -405,15 +696,13 @@ def build_training_data(dfret: pd.DataFrame, configs: Dict[str,str]) -> pd.DataF
     try:
         for key, value in configs.items():
             configs[key] = flatten_dict(value, sep="")
-        config_df = pd.DataFrame(configs).T
+        config_df = pd.DataFrame(list(configs.values()))
 
-        # seperate out an sid and rid column
-        config_df["sid-rid-tuple"] = config_df.index.to_numpy()
-        config_df = config_df.reset_index(drop=True)
+        # seperate out an sid and rid column from the (sid, rid) keys
         try:
-            config_df["sid"] = config_df.apply(lambda r: r["sid-rid-tuple"][0], axis=1)
-            config_df["rid"] = config_df.apply(lambda r: r["sid-rid-tuple"][1], axis=1)
-            config_df = config_df.drop(columns=["sid-rid-tuple"])
+            sids, rids = zip(*configs)
+            config_df["sid"] = sids
+            config_df["rid"] = rids
         except ValueError as ve:
             logger.info("error building dataframe. possibly no data found")
             logger.info("config_df.shape = {}".format(config_df.shape))
@@ -462,43 +751,26 @@ def build_training_data(dfret: pd.DataFrame, configs: Dict[str,str]) -> pd.DataF
     # The old workflow wrote data to CSV before ingesting it in this workflow. This had
     # the side effect of converting list objects to strings, which must be processed
     # differently. The application needs updating to handle list objects directly.
-    dfret.to_csv("training_data.csv")
-    dfret = pd.read_csv("training_data.csv", index_col=0)
+    return normalize_training_data(dfret)
 
-    return dfret
 
-
-@task
-def process_attachments(attachments: Dict[str, ByteString]) -> Dict[str, str]:
-    """A task to convert the attachment bytestreams into JSON strings.
-
-    :param attachments: A dictionary containing all the JSON bytestreams.
-    :return: A dictionary containing the JSON strings.
-    """
-    for key, value in attachments.items():
-        decoded = zlib.decompress(value['popeye.json.gz'], 16 + zlib.MAX_WBITS).decode()
-        attachments[key] = json.loads(decoded)["config"]
-    return attachments
-
-
-def filter_data(opts: argparse.Namespace, data: pd.DataFrame) -> pd.DataFrame:
+def filter_data(opts: argparse.Namespace, data: pd.DataFrame, suffix: str = "") -> pd.DataFrame:
     """Filter tabular data by user regression tag.
 
     :param opts: Namespace containing the regression tag(s) to search for.
     :param data: Tabular data from EAP.
+    :param suffix: Suffix of the intermediate files, so that concurrent calls do not overwrite
+        each other's.
     :return: The fitlered data.
     """
     if opts.keep_intermediates:
-        joblib.dump(data, 'filter_data.data.pkl')
-        joblib.dump(opts, 'filter_data.opts.pkl')
+        joblib.dump(data, f'filter_data{suffix}.data.pkl')
+        joblib.dump(opts, f'filter_data{suffix}.opts.pkl')
 
-    def intersection(lista, listb):
-        if set(lista) & set(listb):
-            return True
-        return False
-
-    data = data.loc[data.apply(lambda x, y=opts.fetch_train_usertag:
-                                    intersection(x.user_regression_tag, y), axis=1)]
+    # one row per (test, tag), then back to one flag per test by position, as the index may hold duplicates
+    tags = data["user_regression_tag"].reset_index(drop=True).explode()
+    has_tag = tags.isin(list(opts.fetch_train_usertag)).groupby(level=0).any()
+    data = data.loc[has_tag.to_numpy()]
 
     if data.empty:
         logger.info("error data filtered by filter_data() is empty!")
@@ -551,21 +823,12 @@ def main():
 
     # Build the flow
     with Flow("flow") as flow:
-        # Set up the filtering/inference data.
-        x_pred = None
-        if opts.candidate_csv:
-            x_pred = dt.files.read_csv(opts.candidate_csv, index_col=0)
-        if opts.num_generate:
-            x_pred = jsons_to_df(json_dir)
-            generate_results = dt.project.generate(dory_project, num_tests=opts.num_generate, json_dir=json_dir)
-            x_pred.set_upstream(generate_results)
-
         # Get data from both sources and concatenate
         if opts.training_csv or opts.fetch_train_data:
             dfs = []
             if opts.fetch_train_data:
-                table_data = get_table_data(opts, eap)
-                df_eap = get_data(opts, table_data, eap)
+                table_data, configs = get_table_data(opts, eap)
+                df_eap = get_data(opts, table_data, configs)
                 dfs.append(df_eap)
 
             if opts.training_csv:
@@ -583,10 +846,24 @@ def main():
 
             # Scatter the training data to the cluster
             scatter_result = scatter([x_train, y_train, groups])
+
+            # the candidates only need the config fields the model is trained on
+            training_fields = get_training_fields(df_train)
         else:
             x_train = None
             y_train = None
             groups = None
+            training_fields = None
+
+        # Set up the filtering/inference data.
+        x_pred = None
+        if opts.candidate_csv:
+            x_pred = dt.files.read_csv(opts.candidate_csv, index_col=0)
+        if opts.num_generate:
+            x_pred = jsons_to_df(json_dir, fields=training_fields, cache_dir=output_dir / "json_cache",
+                                 csvfile="generated.csv" if opts.keep_intermediates else None)
+            generate_results = dt.project.generate(dory_project, num_tests=opts.num_generate, json_dir=json_dir)
+            x_pred.set_upstream(generate_results)
 
         if opts.keep_intermediates:
             x_pred_file = dt.files.dump_pickle(x_pred, "x_pred.pkl")
@@ -4,7 +4,6 @@ import subprocess
 
 import os
 import logging
-import pandas as pd
 import shutil
 
 import pathlib
@@ -90,27 +89,15 @@ class PopeyeDoryInterface(ProjectInterface):
         """
         logging.debug("Writing regression testlist...")
 
-        regress_df = pd.DataFrame()
-        build_df = pd.DataFrame()
-
-        unique_builds_map = {}
-        builds_list = []
-        build_tags_list = []
-        i = 0
-        for build in tests.build_options.unique():
-            unique_builds_map[build] = "build{}".format(i)
-            builds_list.append(build.split(" ")[1])
-            build_tags_list.append(unique_builds_map[build])
-            i += 1
-
-        build_df["build_options"] = builds_list
-        build_df["tag"] = build_tags_list
-
-        regress_df["config"] = tests.command.apply(
-            lambda x: self.__class__._get_configs_from_command(x)
+        # configs and build tags are worked out once per unique command and build, then mapped onto the tests
+        configs = tests.command.map(
+            {command: str(self._get_configs_from_command(command)) for command in tests.command.unique()}
         )
-        regress_df["seed"] = tests.seed
-        regress_df["build"] = tests.build_options.apply(lambda x: unique_builds_map[x])
+        builds = tests.build_options.unique()
+        tags = tests.build_options.map({build: "build{}".format(i) for i, build in enumerate(builds)})
+
+        regress_lines = "1 " + configs + " SEED=" + tests.seed.map(str) + " TAGS=" + tags + "\n"
+        build_lines = ["{} TAGS=build{}\n".format(build.split(" ")[1], i) for i, build in enumerate(builds)]
 
         regress_f = regress
         if not build_out:
@@ -119,14 +106,10 @@ class PopeyeDoryInterface(ProjectInterface):
             build_f = build_out
 
         with open(regress_f, "w+") as fd:
-            for row in regress_df.itertuples():
-                line = "1 {} SEED={} TAGS={}\n".format(row.config, row.seed, row.build)
-                fd.write(line)
+            fd.write("".join(regress_lines))
 
         with open(build_f, "w+") as fd:
-            for row in build_df.itertuples():
-                line = "{} TAGS={}\n".format(row.build_options, row.tag)
-                fd.write(line)
+            fd.write("".join(build_lines))
 
         return regress_f
 
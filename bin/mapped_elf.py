@@ -0,0 +1,148 @@
+"""
+helper module giving zero-copy access to the segments and sections of an ELF file through a memory map.
+
+The headers are parsed once when the reader is created; segment and section contents are returned as
+C{memoryview} slices of the map, so that one reader can be shared by all the steps of a tool invocation without
+re-reading or copying the file.
+"""
+
+import mmap
+from collections import namedtuple
+from struct import unpack_from
+
+import numpy as np
+
+ELF_MAGIC = b"\x7fELF"
+ELFCLASS32 = 1
+ELFCLASS64 = 2
+ELFDATA2LSB = 1
+
+SHT_SYMTAB = 2
+SHT_NOBITS = 8
+
+SegmentMeta = namedtuple("SegmentMeta", "p_type p_flags p_offset p_vaddr p_paddr p_filesz p_memsz p_align")
+SectionMeta = namedtuple("SectionMeta", "name sh_type sh_flags sh_addr sh_offset sh_size sh_link sh_info sh_addralign sh_entsize")
+Symbol = namedtuple("Symbol", "name value size section")
+
+# ELF header fields from e_type to e_shstrndx, program and section header layouts, per ELF class
+ELF_LAYOUTS = {ELFCLASS32: ("HHIIIIIHHHHHH", "IIIIIIII", "IIIIIIIIII"),
+               ELFCLASS64: ("HHIQQQIHHHHHH", "IIQQQQQQ", "IIQQQQIIQQ")}
+
+# symbol table entry fields, per ELF class
+SYMBOL_FIELDS = {ELFCLASS32: (("st_name", "u4"), ("st_value", "u4"), ("st_size", "u4"),
+                              ("st_info", "u1"), ("st_other", "u1"), ("st_shndx", "u2")),
+                 ELFCLASS64: (("st_name", "u4"), ("st_info", "u1"), ("st_other", "u1"), ("st_shndx", "u2"),
+                              ("st_value", "u8"), ("st_size", "u8"))}
+
+def get_string(strings, offset):
+    "return the null terminated string at L{offset} of a string table"
+    end = strings.find(b"\0", offset)
+    return strings[offset:end if end >= 0 else None].decode("ascii", "ignore")
+
+class MappedElfReader:
+    "read-only, memory-mapped ELF file"
+
+    def __init__(self, elf_fd):
+        """
+        @param elf_fd: file object (text or binary) of the ELF file, only its file descriptor is used
+        """
+        self.map = mmap.mmap(elf_fd.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data = memoryview(self.map)
+
+        if self.data[:4] != ELF_MAGIC:
+            raise ValueError("not an ELF file")
+        elf_class, elf_data = self.data[4], self.data[5]
+        if elf_class not in ELF_LAYOUTS:
+            raise ValueError("unsupported ELF class {}".format(elf_class))
+        endianness = "<" if elf_data == ELFDATA2LSB else ">"
+        self.symbol_dtype = np.dtype([(name, endianness + field_type) for name, field_type in SYMBOL_FIELDS[elf_class]])
+        header_layout, segment_layout, section_layout = (endianness + layout for layout in ELF_LAYOUTS[elf_class])
+
+        (_, _, _, _, e_phoff, e_shoff, _, _,
+         e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx) = unpack_from(header_layout, self.data, 16)
+
+        self.segments = []
+        for index in range(e_phnum):
+            fields = unpack_from(segment_layout, self.data, e_phoff + index * e_phentsize)
+            if elf_class == ELFCLASS32:
+                # p_flags comes after p_memsz in 32-bit program headers
+                p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align = fields
+            else:
+                p_type, p_flags, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_align = fields
+            self.segments.append(SegmentMeta(p_type, p_flags, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_align))
+
+        raw_sections = [unpack_from(section_layout, self.data, e_shoff + index * e_shentsize) for index in range(e_shnum)]
+        self.section_list = []
+        if raw_sections:
+            _, names_type, _, _, names_offset, names_size, *_ = raw_sections[e_shstrndx]
+            names = bytes(self._get_data(names_type, names_offset, names_size))
+            for sh_name, *fields in raw_sections:
+                self.section_list.append(SectionMeta(get_string(names, sh_name), *fields))
+        self.sections = {section.name: section for section in self.section_list}
+        self.symbols = None
+
+    def _get_data(self, sh_type, sh_offset, sh_size):
+        "return the content of a section as a memoryview, given its header fields"
+        if sh_type == SHT_NOBITS:
+            return self.data[0:0]
+        return self.data[sh_offset:sh_offset + sh_size]
+
+    def get_all_segment_meta(self):
+        "return the list of L{SegmentMeta} of the program headers"
+        return self.segments
+
+    def get_segment_data(self, index):
+        "return the file content of the segment at L{index} as a memoryview"
+        segment = self.segments[index]
+        return self.data[segment.p_offset:segment.p_offset + segment.p_filesz]
+
+    def get_section_names(self, prefix=""):
+        "return the names of the sections starting with L{prefix}"
+        return [name for name in self.sections if name.startswith(prefix)]
+
+    def get_section_data(self, name):
+        "return the content of section L{name} as a memoryview, None if there is no such section"
+        section = self.sections.get(name)
+        if section is None:
+            return None
+        return self._get_data(section.sh_type, section.sh_offset, section.sh_size)
+
+    def get_ranges(self, name):
+        """
+        return the content of the popeye range section L{name} as a dict of payload name to list of
+        (start, size) tuples, an empty dict if there is no such section
+        """
+        data = self.get_section_data(name)
+        if data is None:
+            return {}
+        range_count, range_table_offset, region_table_offset, string_table_offset = unpack_from("<QQQQ", data)
+        range_table = np.frombuffer(data, dtype="<u8", count=3 * range_count, offset=range_table_offset).reshape(-1, 3)
+        strings = bytes(data[string_table_offset:])
+
+        ranges = {}
+        for first_region, region_count, string_offset in range_table.tolist():
+            regions = np.frombuffer(data, dtype="<u8", count=2 * region_count,
+                                    offset=region_table_offset + 16 * first_region).reshape(-1, 2)
+            ranges[get_string(strings, string_offset)] = [tuple(region) for region in regions.tolist()]
+        return ranges
+
+    def get_symbols(self):
+        "return the list of L{Symbol} of the symbol table, parsed on the first call"
+        if self.symbols is None:
+            self.symbols = []
+            for section in self.section_list:
+                if section.sh_type != SHT_SYMTAB:
+                    continue
+                strings_section = self.section_list[section.sh_link]
+                strings = bytes(self._get_data(strings_section.sh_type, strings_section.sh_offset, strings_section.sh_size))
+                entries = np.frombuffer(self._get_data(section.sh_type, section.sh_offset, section.sh_size), dtype=self.symbol_dtype)
+                for st_name, st_value, st_size, st_shndx in zip(entries["st_name"].tolist(), entries["st_value"].tolist(),
+                                                                entries["st_size"].tolist(), entries["st_shndx"].tolist()):
+                    section_name = self.section_list[st_shndx].name if 0 < st_shndx < len(self.section_list) else None
+                    self.symbols.append(Symbol(get_string(strings, st_name), st_value, st_size, section_name))
+        return self.symbols
+
+    def close(self):
+        "release the memory map, all the memoryviews returned by the reader must have been released"
+        self.data.release()
+        self.map.close()
@@ -0,0 +1,989 @@
+"""
+Morello / Arran capability decoder.
+
+The fields, bounds and representable range of a capability are decoded according to one of the supported versions of
+the specification (MORELLO_SPEC_VERSIONS):
+    - decode_capability decodes one capability into an ordered, read-only mapping of FieldValue records. The results
+      are cached on (capability, spec_version), as the same register values keep coming back in tarmac traces.
+    - format_field_values and format_capability_summary pretty-print the decoded fields, as a bit diagram or as a
+      single line to annotate a trace.
+    - decode_capabilities decodes a whole list of capabilities at once into columns of values.
+"""
+
+# pylint: disable=missing-docstring
+# pylint: disable=invalid-name
+# pylint: disable=too-many-statements
+# pylint: disable=line-too-long
+# pylint: disable=redefined-outer-name
+
+import collections
+import functools
+import re
+import types
+
+import numpy as np
+
+# number of decoded capabilities kept by decode_capability
+DECODE_CACHE_SIZE = 1 << 16
+
+class Field(collections.namedtuple('Field', ['name', 'high_bit', 'low_bit', 'to_string'])):
+    __slots__ = ()
+
+    def __new__(cls, name, high_bit, low_bit = None, to_string = None):
+        if low_bit is None:
+            low_bit = high_bit
+        return super().__new__(cls, name, high_bit, low_bit, to_string)
+
+    def __str__(self):
+        if self.high_bit == self.low_bit:
+            return '{0} {1}'.format(self.low_bit, self.high_bit)
+        else:
+            return '{0} {1}:{2}'.format(self.high_bit, self.low_bit, self.name)
+
+# field is None for the values computed from several fields (bounds, exponent...)
+class FieldValue(collections.namedtuple('FieldValue', ['field', 'value', 'description', 'name'])):
+    __slots__ = ()
+
+    def __new__(cls, field, value, description = None, name = None):
+        if name is None and field:
+            name = field.name
+        return super().__new__(cls, field, value, description, name)
+
+    @classmethod
+    def from_name_and_value(cls, name, value, description = None):
+        return cls(None, value, description, name)
+
+    def __str__(self):
+        return '{0}={1}'.format(self.name, self.value)
+
+                                                                              # armv8-pseudocode revision
+MORELLO_ALPHA1='morello-alpha1'                                               # 558ebd4b3dc5c071272c37e5ecb6835f95a4b2f2
+MORELLO_BETA0='morello-beta0'                                                 # 1cd63969f74bb357cb62c3c4ae3d2f2876f2ffd3
+MORELLO_BETA0_UPDATE='morello-beta0-arran-596'                                # f457d6fe0847757a573a28b2df41fc8b99fd3b82
+MORELLO_BETA0_FIXED_CHERI_CONCENTRATE='morello-beta0-fixed-cheri-concentrate' # 7b72a3aad14ac0c143f914574efec01e5d2fedd4
+MORELLO_BETA1='morello-beta1'                                                 # b3668e86be5c1926e6d6efd6c3a3981b35a5a674
+MORELLO_BETA1_ARRAN_822='morello-beta1-arran-822'                             # 6434eca83f073c3f6cc7139763f61f475e24365c
+DEFAULT_SPEC_VERSION=MORELLO_BETA1_ARRAN_822
+
+MORELLO_SPEC_VERSIONS = [MORELLO_ALPHA1,
+                         MORELLO_BETA0,
+                         MORELLO_BETA0_UPDATE,
+                         MORELLO_BETA0_FIXED_CHERI_CONCENTRATE,
+                         MORELLO_BETA1,
+                         MORELLO_BETA1_ARRAN_822]
+
+MORELLO_ALPHA1_PERMISSIONS = [ Field('Load', 17),
+                               Field('Store', 16),
+                               Field('Execute', 15),
+                               Field('LoadCap', 14),
+                               Field('StoreCap', 13),
+                               Field('StoreLocalCap', 12),
+                               Field('Seal', 11),
+                               Field('Unseal', 10),
+                               Field('System', 9),
+                               Field('BranchUnseal', 8),
+                               Field('CompartmentID', 7),
+                               Field('MutableLoad', 6),
+                               Field('User', 5, 2),
+                               Field('Global', 1),
+                               Field('Executive', 0) ]
+MORELLO_ALPHA1_OBJECT_TYPES = { 1: 'RB',
+                                2: 'LPB',
+                                3: 'LB' }
+MORELLO_ALPHA1_FIELDS = [ Field('Tag', 128),
+                          Field('Permissions', 127, 110, lambda x: permissions_to_str(x, MORELLO_ALPHA1_PERMISSIONS)),
+                          Field('ObjectType',  109, 95,  lambda x: object_type_to_str(x, MORELLO_ALPHA1_OBJECT_TYPES)),
+                          Field('Bounds[86:56]', 94, 64),
+                          Field('Flags', 63, 56),
+                          Field('Bounds[55:0]', 55, 0),
+                          Field('Value', 63, 0) ]
+
+# The only difference between alpha 1 and beta 0 is the Executive and Global bits are swapped.
+MORELLO_BETA0_PERMISSIONS = [ Field('Load', 17),
+                              Field('Store', 16),
+                              Field('Execute', 15),
+                              Field('LoadCap', 14),
+                              Field('StoreCap', 13),
+                              Field('StoreLocalCap', 12),
+                              Field('Seal', 11),
+                              Field('Unseal', 10),
+                              Field('System', 9),
+                              Field('BranchUnseal', 8),
+                              Field('CompartmentID', 7),
+                              Field('MutableLoad', 6),
+                              Field('User', 5, 2),
+                              Field('Executive', 1),
+                              Field('Global', 0) ]
+MORELLO_BETA0_FIELDS = [ Field('Tag', 128),
+                          Field('Permissions', 127, 110, lambda x: permissions_to_str(x, MORELLO_BETA0_PERMISSIONS)),
+                          Field('ObjectType',  109, 95,  lambda x: object_type_to_str(x, MORELLO_ALPHA1_OBJECT_TYPES)),
+                          Field('Bounds[86:56]', 94, 64),
+                          Field('Flags', 63, 56),
+                          Field('Bounds[55:0]', 55, 0),
+                          Field('Value', 63, 0) ]
+
+MORELLO_BETA0_UPDATE_FIELDS = [ Field('Tag', 128),
+                                Field('Permissions', 127, 110, lambda x: permissions_to_str(x, MORELLO_BETA0_PERMISSIONS)),
+                                Field('ObjectType',  109, 95,  lambda x: object_type_to_str(x, MORELLO_ALPHA1_OBJECT_TYPES)),
+                                Field('IE', 94),
+                                Field('Limit', 93, 80),
+                                Field('Base', 79, 64),
+                                Field('Flags', 63, 56),
+                                Field('Bounds[55:0]', 55, 0),
+                                Field('Value', 63, 0) ]
+
+MORELLO_BETA1_FIELDS = MORELLO_BETA0_UPDATE_FIELDS
+MORELLO_BETA1_ARRAN_822_FIELDS = MORELLO_BETA0_UPDATE_FIELDS
+
+MORELLO_SPEC_VERSION_TO_FIELDS = {
+    MORELLO_ALPHA1: MORELLO_ALPHA1_FIELDS,
+    MORELLO_BETA0:  MORELLO_BETA0_FIELDS,
+    MORELLO_BETA0_UPDATE: MORELLO_BETA0_UPDATE_FIELDS,
+    MORELLO_BETA0_FIXED_CHERI_CONCENTRATE: MORELLO_BETA0_UPDATE_FIELDS,
+    MORELLO_BETA1: MORELLO_BETA1_FIELDS,
+    MORELLO_BETA1_ARRAN_822: MORELLO_BETA1_ARRAN_822_FIELDS
+}
+
+_MORELLO_ALPHA1_CAP_IE_BIT = 90
+_MORELLO_ALPHA1_CAP_LIMIT_EXP_HI_BIT = 80
+_MORELLO_ALPHA1_CAP_LIMIT_HI_BIT = 89
+_MORELLO_ALPHA1_CAP_LIMIT_LO_BIT = 78
+_MORELLO_ALPHA1_CAP_BASE_EXP_HI_BIT = 66
+_MORELLO_ALPHA1_CAP_BASE_HI_BIT = 77
+_MORELLO_ALPHA1_CAP_BASE_LO_BIT = 64
+_MORELLO_ALPHA1_CAP_VALUE_HI_BIT = 63
+_MORELLO_ALPHA1_CAP_VALUE_LO_BIT = 0
+_MORELLO_ALPHA1_CAP_VALUE_FOR_BOUND_HI_BIT = 55
+_MORELLO_ALPHA1_CAP_MW = _MORELLO_ALPHA1_CAP_BASE_HI_BIT - _MORELLO_ALPHA1_CAP_BASE_LO_BIT + 1
+_MORELLO_ALPHA1_CAP_LIMIT_NUM_BITS = _MORELLO_ALPHA1_CAP_LIMIT_HI_BIT - _MORELLO_ALPHA1_CAP_LIMIT_LO_BIT + 1
+_MORELLO_ALPHA1_CAP_VALUE_FOR_BOUND_NUM_BITS = _MORELLO_ALPHA1_CAP_VALUE_FOR_BOUND_HI_BIT - _MORELLO_ALPHA1_CAP_VALUE_LO_BIT + 1
+_MORELLO_ALPHA1_CAP_VALUE_NUM_BITS = _MORELLO_ALPHA1_CAP_VALUE_HI_BIT - _MORELLO_ALPHA1_CAP_VALUE_LO_BIT + 1
+
+_MORELLO_BETA0_UPDATE_CAP_IE_BIT = 94
+_MORELLO_BETA0_UPDATE_CAP_LIMIT_HI_BIT = 93
+_MORELLO_BETA0_UPDATE_CAP_LIMIT_EXP_HI_BIT = 82
+_MORELLO_BETA0_UPDATE_CAP_LIMIT_LO_BIT = 80
+_MORELLO_BETA0_UPDATE_CAP_BASE_HI_BIT = 79
+_MORELLO_BETA0_UPDATE_CAP_BASE_EXP_HI_BIT = 66
+_MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT = 64
+_MORELLO_BETA0_UPDATE_CAP_VALUE_HI_BIT = 63
+_MORELLO_BETA0_UPDATE_CAP_VALUE_LO_BIT = 0
+_MORELLO_BETA0_UPDATE_CAP_VALUE_FOR_BOUND_HI_BIT = 55
+_MORELLO_BETA0_UPDATE_CAP_MW = _MORELLO_BETA0_UPDATE_CAP_BASE_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT + 1
+_MORELLO_BETA0_UPDATE_CAP_LIMIT_NUM_BITS = _MORELLO_BETA0_UPDATE_CAP_LIMIT_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_LIMIT_LO_BIT + 1
+_MORELLO_BETA0_UPDATE_CAP_VALUE_FOR_BOUND_NUM_BITS = _MORELLO_BETA0_UPDATE_CAP_VALUE_FOR_BOUND_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_VALUE_LO_BIT + 1
+_MORELLO_BETA0_UPDATE_CAP_VALUE_NUM_BITS = _MORELLO_BETA0_UPDATE_CAP_VALUE_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_VALUE_LO_BIT + 1
+
+_MORELLO_BETA0_FIXED_CAP_IE_BIT                 = 94
+_MORELLO_BETA0_FIXED_CAP_LIMIT_HI_BIT           = 93
+_MORELLO_BETA0_FIXED_CAP_LIMIT_MANTISSA_LO_BIT  = 83
+_MORELLO_BETA0_FIXED_CAP_LIMIT_EXP_HI_BIT       = 82
+_MORELLO_BETA0_FIXED_CAP_LIMIT_LO_BIT           = 80
+_MORELLO_BETA0_FIXED_CAP_BASE_HI_BIT            = 79
+_MORELLO_BETA0_FIXED_CAP_BASE_MANTISSA_LO_BIT   = 67
+_MORELLO_BETA0_FIXED_CAP_BASE_EXP_HI_BIT        = 66
+_MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT            = 64
+_MORELLO_BETA0_FIXED_CAP_VALUE_HI_BIT           = 63
+_MORELLO_BETA0_FIXED_CAP_VALUE_LO_BIT           = 0
+_MORELLO_BETA0_FIXED_CAP_VALUE_FOR_BOUND_HI_BIT = 55
+_MORELLO_BETA0_FIXED_CAP_FLAGS_LO_BIT           = 56
+_MORELLO_BETA0_FIXED_CAP_FLAGS_HI_BIT           = 63
+_MORELLO_BETA0_FIXED_CAP_VALUE_NUM_BITS = _MORELLO_BETA0_FIXED_CAP_VALUE_HI_BIT-_MORELLO_BETA0_FIXED_CAP_VALUE_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_VALUE_FOR_BOUND_NUM_BITS = _MORELLO_BETA0_FIXED_CAP_VALUE_FOR_BOUND_HI_BIT-_MORELLO_BETA0_FIXED_CAP_VALUE_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_BASE_MANTISSA_NUM_BITS = _MORELLO_BETA0_FIXED_CAP_BASE_HI_BIT-_MORELLO_BETA0_FIXED_CAP_BASE_MANTISSA_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_LIMIT_NUM_BITS = _MORELLO_BETA0_FIXED_CAP_LIMIT_HI_BIT-_MORELLO_BETA0_FIXED_CAP_LIMIT_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_LIMIT_MANTISSA_NUM_BITS = _MORELLO_BETA0_FIXED_CAP_LIMIT_HI_BIT-_MORELLO_BETA0_FIXED_CAP_LIMIT_MANTISSA_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_MW = _MORELLO_BETA0_FIXED_CAP_BASE_HI_BIT-_MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT+1
+_MORELLO_BETA0_FIXED_CAP_MAX_EXPONENT = _MORELLO_BETA0_FIXED_CAP_VALUE_NUM_BITS-_MORELLO_BETA0_FIXED_CAP_MW+2
+
+_MORELLO_BETA1_CAP_IE_BIT                 = 94
+_MORELLO_BETA1_CAP_LIMIT_HI_BIT           = 93
+_MORELLO_BETA1_CAP_LIMIT_MANTISSA_LO_BIT  = 83
+_MORELLO_BETA1_CAP_LIMIT_EXP_HI_BIT       = 82
+_MORELLO_BETA1_CAP_LIMIT_LO_BIT           = 80
+_MORELLO_BETA1_CAP_BASE_HI_BIT            = 79
+_MORELLO_BETA1_CAP_BASE_MANTISSA_LO_BIT   = 67
+_MORELLO_BETA1_CAP_BASE_EXP_HI_BIT        = 66
+_MORELLO_BETA1_CAP_BASE_LO_BIT            = 64
+_MORELLO_BETA1_CAP_VALUE_HI_BIT           = 63
+_MORELLO_BETA1_CAP_VALUE_LO_BIT           = 0
+_MORELLO_BETA1_CAP_VALUE_FOR_BOUND_HI_BIT = 55
+_MORELLO_BETA1_CAP_FLAGS_LO_BIT           = 56
+_MORELLO_BETA1_CAP_FLAGS_HI_BIT           = 63
+_MORELLO_BETA1_CAP_VALUE_NUM_BITS = _MORELLO_BETA1_CAP_VALUE_HI_BIT-_MORELLO_BETA1_CAP_VALUE_LO_BIT+1
+_MORELLO_BETA1_CAP_VALUE_FOR_BOUND_NUM_BITS = _MORELLO_BETA1_CAP_VALUE_FOR_BOUND_HI_BIT-_MORELLO_BETA1_CAP_VALUE_LO_BIT+1
+_MORELLO_BETA1_CAP_BASE_MANTISSA_NUM_BITS = _MORELLO_BETA1_CAP_BASE_HI_BIT-_MORELLO_BETA1_CAP_BASE_MANTISSA_LO_BIT+1
+_MORELLO_BETA1_CAP_LIMIT_NUM_BITS = _MORELLO_BETA1_CAP_LIMIT_HI_BIT-_MORELLO_BETA1_CAP_LIMIT_LO_BIT+1
+_MORELLO_BETA1_CAP_LIMIT_MANTISSA_NUM_BITS = _MORELLO_BETA1_CAP_LIMIT_HI_BIT-_MORELLO_BETA1_CAP_LIMIT_MANTISSA_LO_BIT+1
+_MORELLO_BETA1_CAP_MW = _MORELLO_BETA1_CAP_BASE_HI_BIT-_MORELLO_BETA1_CAP_BASE_LO_BIT+1
+_MORELLO_BETA1_CAP_MAX_EXPONENT = _MORELLO_BETA1_CAP_VALUE_NUM_BITS-_MORELLO_BETA1_CAP_MW+2
+
+_MORELLO_BETA1_ARRAN_822_CAP_MAX_ENCODEABLE_EXPONENT = 63
+_MORELLO_BETA1_ARRAN_822_CAP_BOUND_MIN               = 0
+_MORELLO_BETA1_ARRAN_822_CAP_BOUND_MAX               = 1<<_MORELLO_BETA1_CAP_VALUE_NUM_BITS
+
+def _get_bit(x, n):
+    return (x >> n) & 1
+
+def _get_slice_hl(x, high, low):
+    return (x >> low) & ((1 << (high - low + 1)) - 1)
+
+def _get_slice_w(x, low, width):
+    return (x >> low) & ((1 << width) - 1)
+
+def _set_bit(x, n, value):
+    return x & ~(1 << n) | (value << n)
+
+def _set_slice_hl(x, high, low, value):
+    mask = (1 << (high - low + 1)) - 1
+    return x & ~(mask << low) | ((value & mask) << low)
+
+def _set_slice_w(x, low, width, value):
+    mask = (1 << width) - 1
+    return x & ~(mask << low) | ((value & mask) << low)
+
+def _sign_extend(x, old_width, new_width):
+    if x & (1 << (old_width - 1)):
+        for i in range(old_width, new_width):
+            x |= 1 << i
+        return x
+    else:
+        return x
+
+def permissions_field_values(permissions, spec_fields):
+    ret = collections.OrderedDict()
+    for field in spec_fields:
+        value = _get_slice_hl(permissions, field.high_bit, field.low_bit)
+        if value:
+            ret[field.name] = FieldValue(field, value)
+    return ret
+
+def permissions_to_str(permissions, spec_fields):
+    field_values = permissions_field_values(permissions, spec_fields)
+    return ', '.join([value.field.name if value.field.low_bit == value.field.high_bit else str(value) for value in field_values.values() if value.value])
+
+def object_type_to_str(object_type, object_type_map):
+    if object_type in object_type_map:
+        return '%s (%d)' % (object_type_map[object_type], object_type)
+    else:
+        return '%d' % object_type
+
+def decode_fields(capability, spec_fields):
+    ret = collections.OrderedDict()
+    for field in spec_fields:
+        value = _get_slice_hl(capability, field.high_bit, field.low_bit)
+        description = field.to_string(value) if field.to_string else None
+        ret[field.name] = FieldValue(field, value, description)
+    return ret
+
+# From Morello alpha1 pseudocode CapGetValueForBound
+def _morello_cap_get_value_for_bound(c):
+    return _sign_extend(_get_slice_w(c, _MORELLO_ALPHA1_CAP_VALUE_LO_BIT, _MORELLO_ALPHA1_CAP_VALUE_FOR_BOUND_NUM_BITS), _MORELLO_ALPHA1_CAP_VALUE_FOR_BOUND_NUM_BITS, _MORELLO_ALPHA1_CAP_VALUE_NUM_BITS)
+
+# From Morello alpha1 pseudocode CapGetBase
+def _morello_cap_get_base(c):
+    ie = _get_bit(c, _MORELLO_ALPHA1_CAP_IE_BIT)
+    b = _get_slice_w(c, _MORELLO_ALPHA1_CAP_BASE_LO_BIT, _MORELLO_ALPHA1_CAP_MW)
+    if ie == 1:
+        exp = (_get_slice_hl(c, _MORELLO_ALPHA1_CAP_LIMIT_EXP_HI_BIT, _MORELLO_ALPHA1_CAP_LIMIT_LO_BIT) << (_MORELLO_ALPHA1_CAP_BASE_EXP_HI_BIT - _MORELLO_ALPHA1_CAP_BASE_LO_BIT + 1)) | _get_slice_hl(c, _MORELLO_ALPHA1_CAP_BASE_EXP_HI_BIT, _MORELLO_ALPHA1_CAP_BASE_LO_BIT)
+        exp = min(exp, _MORELLO_ALPHA1_CAP_VALUE_NUM_BITS-_MORELLO_ALPHA1_CAP_MW+2)
+        b = _set_slice_hl(b, 2, 0, 0)
+    else:
+        exp = 0
+    base = 0
+    a = _morello_cap_get_value_for_bound(c)
+    a3 = _get_slice_hl(a, exp+_MORELLO_ALPHA1_CAP_MW-1, exp+_MORELLO_ALPHA1_CAP_MW-3)
+    b3 = _get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-1, _MORELLO_ALPHA1_CAP_MW-3)
+    r = b3 - 1
+    if a3 < r:
+        if b3 < r:
+            cb = 0
+        else:
+            cb = -1
+    else:
+        if b3 < r:
+            cb = 1
+        else:
+            cb = 0
+    if exp < 50:
+        base = _set_slice_hl(base, 63, exp+_MORELLO_ALPHA1_CAP_MW, _get_slice_hl(_get_slice_hl(a, 63, exp+_MORELLO_ALPHA1_CAP_MW) + cb, 63-_MORELLO_ALPHA1_CAP_MW-exp, 0))
+    base = _set_slice_hl(base, exp+_MORELLO_ALPHA1_CAP_MW-1, exp, _get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-1, 0))
+    base = _set_slice_hl(base, exp-1, 0, 0)
+    return base & 0xffffffffffffffff
+
+# From Morello alpha1 pseudocode ExtendLimit
+def _morello_extend_limit(t, b, ie):
+    if ie == 1:
+        base_lo = _get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-3, 3)
+        limit_lo = _get_slice_hl(t, _MORELLO_ALPHA1_CAP_MW-3, 3)
+    else:
+        base_lo = _get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-3, 0)
+        limit_lo = _get_slice_hl(t, _MORELLO_ALPHA1_CAP_MW-3, 0)
+    if limit_lo < base_lo:
+        l_carry_out = 1
+    else:
+        l_carry_out = 0
+    l_msb = ie
+    return _get_slice_hl(_get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-1, _MORELLO_ALPHA1_CAP_MW-2) + l_carry_out + l_msb, 1, 0)
+
+# From Morello alpha1 pseudocode CapGetLimit
+def _morello_cap_get_limit(c):
+    ie = _get_bit(c, _MORELLO_ALPHA1_CAP_IE_BIT)
+    b = _get_slice_w(c, _MORELLO_ALPHA1_CAP_BASE_LO_BIT, _MORELLO_ALPHA1_CAP_MW)
+    t = _set_slice_w(0, 0, _MORELLO_ALPHA1_CAP_LIMIT_NUM_BITS, _get_slice_w(c, _MORELLO_ALPHA1_CAP_LIMIT_LO_BIT, _MORELLO_ALPHA1_CAP_LIMIT_NUM_BITS))
+    if ie == 1:
+        exp = (_get_slice_hl(c, _MORELLO_ALPHA1_CAP_LIMIT_EXP_HI_BIT, _MORELLO_ALPHA1_CAP_LIMIT_LO_BIT) << (_MORELLO_ALPHA1_CAP_BASE_EXP_HI_BIT - _MORELLO_ALPHA1_CAP_BASE_LO_BIT + 1)) | _get_slice_hl(c, _MORELLO_ALPHA1_CAP_BASE_EXP_HI_BIT, _MORELLO_ALPHA1_CAP_BASE_LO_BIT)
+        exp = min(exp, _MORELLO_ALPHA1_CAP_VALUE_NUM_BITS-_MORELLO_ALPHA1_CAP_MW+2)
+        b = _set_slice_hl(b, 2, 0, 0)
+        t = _set_slice_hl(t, 2, 0, 0)
+    else:
+        exp = 0
+    t = _set_slice_hl(t, _MORELLO_ALPHA1_CAP_MW-1, _MORELLO_ALPHA1_CAP_MW-2, _morello_extend_limit(_get_slice_w(t, 0, _MORELLO_ALPHA1_CAP_LIMIT_NUM_BITS), b, ie))
+    limit = 0
+    a = _morello_cap_get_value_for_bound(c)
+    a3 = _get_slice_hl(a, exp+_MORELLO_ALPHA1_CAP_MW-1, exp+_MORELLO_ALPHA1_CAP_MW-3)
+    b3 = _get_slice_hl(b, _MORELLO_ALPHA1_CAP_MW-1, _MORELLO_ALPHA1_CAP_MW-3)
+    t3 = _get_slice_hl(t, _MORELLO_ALPHA1_CAP_MW-1, _MORELLO_ALPHA1_CAP_MW-3)
+    r = _get_slice_w(b3 - 1, 0, _MORELLO_ALPHA1_CAP_VALUE_NUM_BITS)
+    if a3 < r:
+        if t3 < r:
+            ct = 0
+        else:
+            ct = -1
+    else:
+        if t3 < r:
+            ct = 1
+        else:
+            ct = 0
+    if exp < 50:
+        limit = _set_slice_hl(limit, 63, exp+_MORELLO_ALPHA1_CAP_MW, _get_slice_hl(_get_slice_hl(a, 63, exp+_MORELLO_ALPHA1_CAP_MW) + ct, 63-_MORELLO_ALPHA1_CAP_MW-exp, 0))
+    limit = _set_slice_hl(limit, exp+_MORELLO_ALPHA1_CAP_MW-1, exp, _get_slice_hl(t, _MORELLO_ALPHA1_CAP_MW-1, 0))
+    limit = _set_slice_hl(limit, exp-1, 0, 0)
+    return limit & 0xffffffffffffffff
+
+def _morello_cap_get_bounds(c):
+    return (_morello_cap_get_base(c), _morello_cap_get_limit(c))
+
+# From Morello beta0 ARRAN-596 pseudocode CapGetValueForBound
+def _morello_beta0_update_cap_get_value_for_bound(c):
+    return _sign_extend(_get_slice_w(c, _MORELLO_BETA0_UPDATE_CAP_VALUE_LO_BIT, _MORELLO_BETA0_UPDATE_CAP_VALUE_FOR_BOUND_NUM_BITS), _MORELLO_BETA0_UPDATE_CAP_VALUE_FOR_BOUND_NUM_BITS, _MORELLO_BETA0_UPDATE_CAP_VALUE_NUM_BITS)
+
+# From Morello beta0 ARRAN-596 pseudocode CapGetBase
+def _morello_beta0_update_cap_get_base(c):
+    ie = _get_bit(c, _MORELLO_BETA0_UPDATE_CAP_IE_BIT)
+    b = _get_slice_w(c, _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT, _MORELLO_BETA0_UPDATE_CAP_MW)
+    if ie == 1:
+        exp = (_get_slice_hl(c, _MORELLO_BETA0_UPDATE_CAP_LIMIT_EXP_HI_BIT, _MORELLO_BETA0_UPDATE_CAP_LIMIT_LO_BIT) << (_MORELLO_BETA0_UPDATE_CAP_BASE_EXP_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT + 1)) | _get_slice_hl(c, _MORELLO_BETA0_UPDATE_CAP_BASE_EXP_HI_BIT, _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT)
+        exp = min(exp, _MORELLO_BETA0_UPDATE_CAP_VALUE_NUM_BITS-_MORELLO_BETA0_UPDATE_CAP_MW+2)
+        b = _set_slice_hl(b, 2, 0, 0)
+    else:
+        exp = 0
+    base = 0
+    a = _morello_cap_get_value_for_bound(c)
+    a3 = _get_slice_hl(a, exp+_MORELLO_BETA0_UPDATE_CAP_MW-1, exp+_MORELLO_BETA0_UPDATE_CAP_MW-3)
+    b3 = _get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-1, _MORELLO_BETA0_UPDATE_CAP_MW-3)
+    r = b3 - 1
+    if a3 < r:
+        if b3 < r:
+            cb = 0
+        else:
+            cb = -1
+    else:
+        if b3 < r:
+            cb = 1
+        else:
+            cb = 0
+    if exp < 50 and exp + _MORELLO_BETA0_UPDATE_CAP_MW <= 63:
+        base = _set_slice_hl(base, 63, exp+_MORELLO_BETA0_UPDATE_CAP_MW, _get_slice_hl(_get_slice_hl(a, 63, exp+_MORELLO_BETA0_UPDATE_CAP_MW) + cb, 63-_MORELLO_BETA0_UPDATE_CAP_MW-exp, 0))
+    base = _set_slice_hl(base, exp+_MORELLO_BETA0_UPDATE_CAP_MW-1, exp, _get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-1, 0))
+    base = _set_slice_hl(base, exp-1, 0, 0)
+    return base & 0xffffffffffffffff
+
+# From Morello beta0 ARRAN-596 pseudocode ExtendLimit
+def _morello_beta0_update_extend_limit(t, b, ie):
+    if ie == 1:
+        base_lo = _get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-3, 3)
+        limit_lo = _get_slice_hl(t, _MORELLO_BETA0_UPDATE_CAP_MW-3, 3)
+    else:
+        base_lo = _get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-3, 0)
+        limit_lo = _get_slice_hl(t, _MORELLO_BETA0_UPDATE_CAP_MW-3, 0)
+    if limit_lo < base_lo:
+        l_carry_out = 1
+    else:
+        l_carry_out = 0
+    l_msb = ie
+    return _get_slice_hl(_get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-1, _MORELLO_BETA0_UPDATE_CAP_MW-2) + l_carry_out + l_msb, 1, 0)
+
+# From Morello beta0 ARRAN-596 pseudocode CapGetLimit
+def _morello_beta0_update_cap_get_limit(c):
+    ie = _get_bit(c, _MORELLO_BETA0_UPDATE_CAP_IE_BIT)
+    b = _get_slice_w(c, _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT, _MORELLO_BETA0_UPDATE_CAP_MW)
+    t = _set_slice_w(0, 0, _MORELLO_BETA0_UPDATE_CAP_LIMIT_NUM_BITS, _get_slice_w(c, _MORELLO_BETA0_UPDATE_CAP_LIMIT_LO_BIT, _MORELLO_BETA0_UPDATE_CAP_LIMIT_NUM_BITS))
+    if ie == 1:
+        exp = (_get_slice_hl(c, _MORELLO_BETA0_UPDATE_CAP_LIMIT_EXP_HI_BIT, _MORELLO_BETA0_UPDATE_CAP_LIMIT_LO_BIT) << (_MORELLO_BETA0_UPDATE_CAP_BASE_EXP_HI_BIT - _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT + 1)) | _get_slice_hl(c, _MORELLO_BETA0_UPDATE_CAP_BASE_EXP_HI_BIT, _MORELLO_BETA0_UPDATE_CAP_BASE_LO_BIT)
+        exp = min(exp, _MORELLO_BETA0_UPDATE_CAP_VALUE_NUM_BITS-_MORELLO_BETA0_UPDATE_CAP_MW+2)
+        b = _set_slice_hl(b, 2, 0, 0)
+        t = _set_slice_hl(t, 2, 0, 0)
+    else:
+        exp = 0
+    t = _set_slice_hl(t, _MORELLO_BETA0_UPDATE_CAP_MW-1, _MORELLO_BETA0_UPDATE_CAP_MW-2, _morello_beta0_update_extend_limit(_get_slice_w(t, 0, _MORELLO_BETA0_UPDATE_CAP_LIMIT_NUM_BITS), b, ie))
+    limit = 0
+    a = _morello_beta0_update_cap_get_value_for_bound(c)
+    a3 = _get_slice_hl(a, exp+_MORELLO_BETA0_UPDATE_CAP_MW-1, exp+_MORELLO_BETA0_UPDATE_CAP_MW-3)
+    b3 = _get_slice_hl(b, _MORELLO_BETA0_UPDATE_CAP_MW-1, _MORELLO_BETA0_UPDATE_CAP_MW-3)
+    t3 = _get_slice_hl(t, _MORELLO_BETA0_UPDATE_CAP_MW-1, _MORELLO_BETA0_UPDATE_CAP_MW-3)
+    r = _get_slice_w((b3 - 1) & 7, 0, _MORELLO_BETA0_UPDATE_CAP_VALUE_NUM_BITS)
+    if a3 < r:
+        if t3 < r:
+            ct = 0
+        else:
+            ct = -1
+    else:
+        if t3 < r:
+            ct = 1
+        else:
+            ct = 0
+    if exp < 50 and exp + _MORELLO_BETA0_UPDATE_CAP_MW <= 63:
+        limit = _set_slice_hl(limit, 63, exp+_MORELLO_BETA0_UPDATE_CAP_MW, _get_slice_hl(_get_slice_hl(a, 63, exp+_MORELLO_BETA0_UPDATE_CAP_MW) + ct, 63-_MORELLO_BETA0_UPDATE_CAP_MW-exp, 0))
+    limit = _set_slice_hl(limit, exp+_MORELLO_BETA0_UPDATE_CAP_MW-1, exp, _get_slice_hl(t, _MORELLO_BETA0_UPDATE_CAP_MW-1, 0))
+    limit = _set_slice_hl(limit, exp-1, 0, 0)
+    return limit & 0xffffffffffffffff
+
+def _morello_beta0_update_cap_get_bounds(c):
+    return (_morello_beta0_update_cap_get_base(c), _morello_beta0_update_cap_get_limit(c))
+
+def _morello_beta0_fixed_cap_is_internal_exponent(c):
+    return _get_bit(c, _MORELLO_BETA0_FIXED_CAP_IE_BIT) == 0
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetExponent
+def _morello_beta0_fixed_cap_get_exponent(c):
+    if _morello_beta0_fixed_cap_is_internal_exponent(c):
+        nexp = (_get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_LIMIT_EXP_HI_BIT, _MORELLO_BETA0_FIXED_CAP_LIMIT_LO_BIT) << \
+                    (_MORELLO_BETA0_FIXED_CAP_BASE_EXP_HI_BIT - _MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT + 1)) | \
+               _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_BASE_EXP_HI_BIT, _MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT)
+        assert (_MORELLO_BETA0_FIXED_CAP_LIMIT_EXP_HI_BIT + _MORELLO_BETA0_FIXED_CAP_BASE_EXP_HI_BIT - \
+                _MORELLO_BETA0_FIXED_CAP_LIMIT_LO_BIT - _MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT + 2) == 6
+        return 0x3f & ~nexp
+    else:
+        return 0
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetEffectiveExponent
+def _morello_beta0_fixed_cap_get_effective_exponent(c):
+    exp = _morello_beta0_fixed_cap_get_exponent(c)
+    if exp < _MORELLO_BETA0_FIXED_CAP_MAX_EXPONENT:
+        return exp
+    else:
+        return _MORELLO_BETA0_FIXED_CAP_MAX_EXPONENT
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetBottom
+def _morello_beta0_fixed_cap_get_bottom(c):
+    if _morello_beta0_fixed_cap_is_internal_exponent(c):
+        return _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_BASE_HI_BIT, _MORELLO_BETA0_FIXED_CAP_BASE_MANTISSA_LO_BIT) << 3
+    else:
+        return _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_BASE_HI_BIT, _MORELLO_BETA0_FIXED_CAP_BASE_LO_BIT)
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetTop
+def _morello_beta0_fixed_cap_get_top(c):
+    lmsb = 0
+    lcarry = 0
+    b = _morello_beta0_fixed_cap_get_bottom(c)
+    if _morello_beta0_fixed_cap_is_internal_exponent(c):
+        lmsb = 1
+        t = _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_LIMIT_HI_BIT, _MORELLO_BETA0_FIXED_CAP_LIMIT_MANTISSA_LO_BIT) << 3
+    else:
+        t = _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_LIMIT_HI_BIT, _MORELLO_BETA0_FIXED_CAP_LIMIT_LO_BIT)
+    if _morello_beta0_fixed_cap_unsigned_less_than(_get_slice_hl(t, _MORELLO_BETA0_FIXED_CAP_MW-3, 0), \
+                                                   _get_slice_hl(b, _MORELLO_BETA0_FIXED_CAP_MW-3, 0)):
+        lcarry = 1
+    t = _set_slice_hl(t, _MORELLO_BETA0_FIXED_CAP_MW-1, _MORELLO_BETA0_FIXED_CAP_MW-2, \
+            _get_slice_hl(b, _MORELLO_BETA0_FIXED_CAP_MW-1, _MORELLO_BETA0_FIXED_CAP_MW-2) + lmsb + lcarry)
+    return t
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetValue
+def _morello_beta0_fixed_cap_get_value(c):
+    return _get_slice_hl(c, _MORELLO_BETA0_FIXED_CAP_VALUE_HI_BIT, _MORELLO_BETA0_FIXED_CAP_VALUE_LO_BIT)
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapUnsignedLessThan
+def _morello_beta0_fixed_cap_unsigned_less_than(a, b):
+    return a < b
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapUnsignedGreaterThan
+def _morello_beta0_fixed_cap_unsigned_greater_than(a, b):
+    return a > b
+
+# From Morello beta0 fixed CHERI concentrate pseudocode CapGetBounds
+def _morello_beta0_fixed_cap_get_bounds(c):
+    exp = _morello_beta0_fixed_cap_get_effective_exponent(c)
+    bottom = _morello_beta0_fixed_cap_get_bottom(c)
+    top = _morello_beta0_fixed_cap_get_top(c)
+    base = 0
+    limit = 0
+    base = _set_slice_hl(base, exp+_MORELLO_BETA0_FIXED_CAP_MW-1, exp, bottom)
+    limit = _set_slice_hl(limit, exp+_MORELLO_BETA0_FIXED_CAP_MW-1, exp, top)
+    a = _morello_beta0_fixed_cap_get_value(c)
+    A3 = _get_slice_hl(a, exp+_MORELLO_BETA0_FIXED_CAP_MW-1, exp+_MORELLO_BETA0_FIXED_CAP_MW-3)
+    B3 = _get_slice_hl(bottom, _MORELLO_BETA0_FIXED_CAP_MW-1, _MORELLO_BETA0_FIXED_CAP_MW-3)
+    T3 = _get_slice_hl(top, _MORELLO_BETA0_FIXED_CAP_MW-1, _MORELLO_BETA0_FIXED_CAP_MW-3)
+    R3 = (B3 - 1) & 0x7
+
+    if _morello_beta0_fixed_cap_unsigned_less_than(A3, R3):
+        aHi = 1
+    else:
+        aHi = 0
+
+    if _morello_beta0_fixed_cap_unsigned_less_than(B3, R3):
+        bHi = 1
+    else:
+        bHi = 0
+
+    if _morello_beta0_fixed_cap_unsigned_less_than(T3, R3):
+        tHi = 1
+    else:
+        tHi = 0
+
+    correction_base = bHi - aHi
+    correction_limit = tHi - aHi
+
+    if exp+_MORELLO_BETA0_FIXED_CAP_MW < _MORELLO_BETA0_FIXED_CAP_MAX_EXPONENT+_MORELLO_BETA0_FIXED_CAP_MW:
+        atop = _get_slice_hl(a, 65, exp+_MORELLO_BETA0_FIXED_CAP_MW)
+        base = _set_slice_hl(base, 65, exp+_MORELLO_BETA0_FIXED_CAP_MW, atop + correction_base)
+        limit = _set_slice_hl(limit, 65, exp+_MORELLO_BETA0_FIXED_CAP_MW, atop + correction_limit)
+
+    l2 = _get_slice_hl(limit, 64, 63)
+    b2 = _get_bit(base, 63)
+    if exp < (_MORELLO_BETA0_FIXED_CAP_MAX_EXPONENT-1) and _morello_beta0_fixed_cap_unsigned_greater_than((l2 - b2) & 0x3, 1):
+        limit = _set_bit(limit, 64, 1 & ~_get_bit(limit, 64))
+
+    return (_get_slice_hl(base, 63, 0), _get_slice_hl(limit, 64, 0))
+
+# From Morello beta1 pseudocode CapIsInternalExponent
+def _morello_beta1_cap_is_internal_exponent(c):
+    return _get_bit(c, _MORELLO_BETA1_CAP_IE_BIT) == 0
+
+# From Morello beta1 pseudocode CapGetExponent
+def _morello_beta1_cap_get_exponent(c):
+    if _morello_beta1_cap_is_internal_exponent(c):
+        nexp = (_get_slice_hl(c, _MORELLO_BETA1_CAP_LIMIT_EXP_HI_BIT, _MORELLO_BETA1_CAP_LIMIT_LO_BIT) << \
+                    (_MORELLO_BETA1_CAP_BASE_EXP_HI_BIT - _MORELLO_BETA1_CAP_BASE_LO_BIT + 1)) | \
+               _get_slice_hl(c, _MORELLO_BETA1_CAP_BASE_EXP_HI_BIT, _MORELLO_BETA1_CAP_BASE_LO_BIT)
+        assert (_MORELLO_BETA1_CAP_LIMIT_EXP_HI_BIT + _MORELLO_BETA1_CAP_BASE_EXP_HI_BIT - \
+                _MORELLO_BETA1_CAP_LIMIT_LO_BIT - _MORELLO_BETA1_CAP_BASE_LO_BIT + 2) == 6
+        return 0x3f & ~nexp
+    else:
+        return 0
+
+# From Morello beta1 pseudocode CapGetEffectiveExponent
+def _morello_beta1_cap_get_effective_exponent(c):
+    exp = _morello_beta1_cap_get_exponent(c)
+    if exp < _MORELLO_BETA1_CAP_MAX_EXPONENT:
+        return exp
+    else:
+        return _MORELLO_BETA1_CAP_MAX_EXPONENT
+
+# From Morello beta1 pseudocode CapGetBottom
+def _morello_beta1_cap_get_bottom(c):
+    if _morello_beta1_cap_is_internal_exponent(c):
+        return _get_slice_hl(c, _MORELLO_BETA1_CAP_BASE_HI_BIT, _MORELLO_BETA1_CAP_BASE_MANTISSA_LO_BIT) << 3
+    else:
+        return _get_slice_hl(c, _MORELLO_BETA1_CAP_BASE_HI_BIT, _MORELLO_BETA1_CAP_BASE_LO_BIT)
+
+# From Morello beta1 pseudocode CapGetTop
+def _morello_beta1_cap_get_top(c):
+    lmsb = 0
+    lcarry = 0
+    b = _morello_beta1_cap_get_bottom(c)
+    if _morello_beta1_cap_is_internal_exponent(c):
+        lmsb = 1
+        t = _get_slice_hl(c, _MORELLO_BETA1_CAP_LIMIT_HI_BIT, _MORELLO_BETA1_CAP_LIMIT_MANTISSA_LO_BIT) << 3
+    else:
+        t = _get_slice_hl(c, _MORELLO_BETA1_CAP_LIMIT_HI_BIT, _MORELLO_BETA1_CAP_LIMIT_LO_BIT)
+    if _morello_beta1_cap_unsigned_less_than(_get_slice_hl(t, _MORELLO_BETA1_CAP_MW-3, 0), \
+                                            _get_slice_hl(b, _MORELLO_BETA1_CAP_MW-3, 0)):
+        lcarry = 1
+    t = _set_slice_hl(t, _MORELLO_BETA1_CAP_MW-1, _MORELLO_BETA1_CAP_MW-2, \
+            _get_slice_hl(b, _MORELLO_BETA1_CAP_MW-1, _MORELLO_BETA1_CAP_MW-2) + lmsb + lcarry)
+    return t
+
+# From Morello beta1 pseudocode CapGetValue
+def _morello_beta1_cap_get_value(c):
+    return _get_slice_hl(c, _MORELLO_BETA1_CAP_VALUE_HI_BIT, _MORELLO_BETA1_CAP_VALUE_LO_BIT)
+
+# From Morello beta1 pseudocode CapBoundsAddress
+def _morello_beta1_cap_bounds_address(address):
+    return _sign_extend(_get_slice_hl(address, _MORELLO_BETA1_CAP_FLAGS_LO_BIT-1, 0), _MORELLO_BETA1_CAP_FLAGS_LO_BIT, _MORELLO_BETA1_CAP_VALUE_NUM_BITS)
+
+# From Morello beta1 pseudocode CapUnsignedLessThan
+def _morello_beta1_cap_unsigned_less_than(a, b):
+    return a < b
+
+# From Morello beta1 pseudocode CapUnsignedGreaterThan
+def _morello_beta1_cap_unsigned_greater_than(a, b):
+    return a > b
+
+# From Morello beta1 pseudocode CapGetBounds
+def _morello_beta1_cap_get_bounds(c):
+    exp = _morello_beta1_cap_get_effective_exponent(c)
+    bottom = _morello_beta1_cap_get_bottom(c)
+    top = _morello_beta1_cap_get_top(c)
+    base = 0
+    limit = 0
+    base = _set_slice_hl(base, exp+_MORELLO_BETA1_CAP_MW-1, exp, bottom)
+    limit = _set_slice_hl(limit, exp+_MORELLO_BETA1_CAP_MW-1, exp, top)
+
+    a = _morello_beta1_cap_bounds_address(_morello_beta1_cap_get_value(c))
+    A3 = _get_slice_hl(a, exp+_MORELLO_BETA1_CAP_MW-1, exp+_MORELLO_BETA1_CAP_MW-3)
+    B3 = _get_slice_hl(bottom, _MORELLO_BETA1_CAP_MW-1, _MORELLO_BETA1_CAP_MW-3)
+    T3 = _get_slice_hl(top, _MORELLO_BETA1_CAP_MW-1, _MORELLO_BETA1_CAP_MW-3)
+    R3 = (B3 - 1) & 0x7
+
+    if _morello_beta1_cap_unsigned_less_than(A3, R3):
+        aHi = 1
+    else:
+        aHi = 0
+
+    if _morello_beta1_cap_unsigned_less_than(B3, R3):
+        bHi = 1
+    else:
+        bHi = 0
+
+    if _morello_beta1_cap_unsigned_less_than(T3, R3):
+        tHi = 1
+    else:
+        tHi = 0
+
+    correction_base = bHi - aHi
+    correction_limit = tHi - aHi
+    if exp+_MORELLO_BETA1_CAP_MW < _MORELLO_BETA1_CAP_MAX_EXPONENT+_MORELLO_BETA1_CAP_MW:
+        atop = _get_slice_hl(a, 65, exp+_MORELLO_BETA1_CAP_MW)
+        base = _set_slice_hl(base, 65, exp+_MORELLO_BETA1_CAP_MW, atop + correction_base)
+        limit = _set_slice_hl(limit, 65, exp+_MORELLO_BETA1_CAP_MW, atop + correction_limit)
+
+    l2 = _get_slice_hl(limit, 64, 63)
+    b2 = _get_bit(base, 63)
+    if exp < (_MORELLO_BETA1_CAP_MAX_EXPONENT-1) and _morello_beta1_cap_unsigned_greater_than((l2 - b2) & 0x3, 1):
+        limit = _set_bit(limit, 64, 1 & ~_get_bit(limit, 64))
+
+    return (_get_slice_hl(base, 63, 0), _get_slice_hl(limit, 64, 0))
+
+# From Morello beta1 ARRAN-822 CapIsExponentOutOfRange
+def _morello_beta1_arran_822_cap_is_exponent_out_of_range(c):
+    exp = _morello_beta1_cap_get_exponent(c)
+    return _MORELLO_BETA1_CAP_MAX_EXPONENT < exp < _MORELLO_BETA1_ARRAN_822_CAP_MAX_ENCODEABLE_EXPONENT
+
+# From Morello beta1 ARRAN 822 CapGetBounds
+def _morello_beta1_arran_822_cap_get_bounds(c):
+    exp = _morello_beta1_cap_get_exponent(c)
+    if exp == _MORELLO_BETA1_ARRAN_822_CAP_MAX_ENCODEABLE_EXPONENT:
+        return (_MORELLO_BETA1_ARRAN_822_CAP_BOUND_MIN, _MORELLO_BETA1_ARRAN_822_CAP_BOUND_MAX)
+    elif _morello_beta1_arran_822_cap_is_exponent_out_of_range(c):
+        return (_MORELLO_BETA1_ARRAN_822_CAP_BOUND_MIN, _MORELLO_BETA1_ARRAN_822_CAP_BOUND_MAX)
+    else:
+        return _morello_beta1_cap_get_bounds(c)
+
+MORELLO_SPEC_VERSION_TO_DECODE = {
+    MORELLO_ALPHA1:                        _morello_cap_get_bounds,
+    MORELLO_BETA0:                         _morello_cap_get_bounds,
+    MORELLO_BETA0_UPDATE:                  _morello_beta0_update_cap_get_bounds,
+    MORELLO_BETA0_FIXED_CHERI_CONCENTRATE: _morello_beta0_fixed_cap_get_bounds,
+    MORELLO_BETA1:                         _morello_beta1_cap_get_bounds,
+    MORELLO_BETA1_ARRAN_822:               _morello_beta1_arran_822_cap_get_bounds
+}
+
+def get_rep_range(c, base):
+    exp = _morello_beta1_cap_get_exponent(c)
+    if exp > _MORELLO_BETA1_CAP_MAX_EXPONENT - 2:
+        RepB = 0
+        RepT = 2**(64)
+    else:
+        B3 = _get_slice_hl(base, _MORELLO_BETA1_CAP_VALUE_HI_BIT-1, (_MORELLO_BETA1_CAP_MW-3+exp))
+        R3 = B3 - 1
+        RepB = R3 << (_MORELLO_BETA1_CAP_MW - 3 + exp)
+        RepT = RepB + 2**(exp + _MORELLO_BETA1_CAP_MW)
+        if RepB < 0:
+            RepB = 2**64 + RepB
+    return RepB, RepT
+
+# The decoded fields are cached, so they are returned as a read-only mapping shared by all the callers
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def _decode_capability(capability, spec_version):
+    if spec_version in MORELLO_SPEC_VERSIONS:
+        fields_spec = MORELLO_SPEC_VERSION_TO_FIELDS[spec_version]
+        decode_function = MORELLO_SPEC_VERSION_TO_DECODE[spec_version]
+    else:
+        raise ValueError('Unsupported specification version: %s' % spec_version)
+    fields = decode_fields(capability, fields_spec)
+    (base, limit) = decode_function(capability)
+    (RepB, RepT) = get_rep_range(capability, base)
+    fields['_Base'] = FieldValue.from_name_and_value('Base', base)
+    fields['_RepB'] = FieldValue.from_name_and_value('RepB', RepB)
+    fields['_Limit'] = FieldValue.from_name_and_value('Limit', limit)
+    fields['_RepT'] = FieldValue.from_name_and_value('RepT', RepT)
+    fields['_exp'] = FieldValue.from_name_and_value('exp', _morello_beta1_cap_get_exponent(capability))
+    return types.MappingProxyType(fields)
+
+def decode_capability(capability, spec_version=DEFAULT_SPEC_VERSION):
+    return _decode_capability(capability, spec_version)
+
+def _field_value_description(field_value):
+    return field_value.description if field_value.description else hex(field_value.value)
+
+def format_field_values(capability, field_values):
+    lines = ['0x{:017x}'.format(capability),
+             '  ' + ''.join('{:>5d}'.format((x - 1) * 4) for x in range(32, 0, -1)),
+             '=' * (5 * 32 + 2),
+             ' {:1x}'.format(_get_slice_w(capability, 32 * 4, 4)) + ''.join('    {:x}'.format(_get_slice_w(capability, (x - 1) * 4, 4)) for x in range(32, 0, -1)),
+             ' ' + ''.join((' ' if (x % 4) == 0 else '') + '{:d}'.format(_get_slice_w(capability, x - 1, 1)) for x in range(129, 0, -1))]
+    field_value_by_high_bit = {}
+    for field_value in [field_value for field_value in field_values.values() if field_value.field]:
+        field_value_by_high_bit[(field_value.field.high_bit, field_value.field.low_bit)] = field_value
+    for _, field_value in sorted(field_value_by_high_bit.items(), reverse=True):
+        pad = 128 - field_value.field.high_bit
+        if pad > 0:
+            pad += (pad // 4) + 2
+        else:
+            pad += 1
+        width = (field_value.field.high_bit + (field_value.field.high_bit // 4)) - (field_value.field.low_bit + (field_value.field.low_bit // 4)) + 1
+        if width > 2:
+            marker = '|' + ('-' * (width - 2)) + '| '
+        elif width == 2:
+            marker = '||'
+        else:
+            marker = '|'
+        lines.append((' ' * pad) + marker + ' ' + field_value.name + ' ' + _field_value_description(field_value))
+    extra_fields = sorted((field_value.name, _field_value_description(field_value)) for field_value in field_values.values() if not field_value.field)
+    max_name_len = max([len(name) for (name, _) in extra_fields], default=0)
+    max_hex_len = max([len(description) for (_, description) in extra_fields if description.startswith('0x')], default=0)
+    for (name, description) in extra_fields:
+        if description.startswith('0x'):
+            description = '0x' + description[2:].rjust(max_hex_len-2, '0')
+        lines.append(name.ljust(max_name_len) + ' ' + description)
+    return '\n'.join(lines) + '\n'
+
+# One line summary of a capability, e.g. to annotate capability registers in a trace
+@functools.lru_cache(maxsize=DECODE_CACHE_SIZE)
+def format_capability_summary(capability, spec_version=DEFAULT_SPEC_VERSION):
+    field_values = decode_capability(capability, spec_version)
+    parts = ['tag={:d}'.format(field_values['Tag'].value),
+             'perms=[{}]'.format(field_values['Permissions'].description),
+             'otype={}'.format(field_values['ObjectType'].description),
+             'value=0x{:x}'.format(field_values['Value'].value),
+             'base=0x{:x}'.format(field_values['_Base'].value),
+             'limit=0x{:x}'.format(field_values['_Limit'].value)]
+    return ' '.join(parts)
+
+# Batch decoding: the capabilities are split into their tag bit and their high and low 64-bit halves, held in uint64
+# arrays, and every field and bound is computed on whole arrays at once.
+
+# number of capabilities decoded at once, to bound the size of the temporary arrays
+BATCH_SIZE = 1 << 16
+
+_MASK_64 = 0xffffffffffffffff
+
+# half of the capability holding a field
+_HALF_LO = 0
+_HALF_HI = 1
+_HALF_TAG = 2
+
+# capability register writes in tarmac / evs traces, e.g. "R C3 1:dc5d4000_00000000_00000000_00000000"
+TARMAC_CAPABILITY_RE = r'\bR\s+(?P<register>C\d+|CSP(?:_EL\d)?|RCSP_EL0|PCC|DDC(?:_EL\d)?|RDDC_EL0|CELR_EL\d)\s+' \
+                       r'(?:(?P<tag>[01])[:_])?(?P<value>[0-9a-fA-F][0-9a-fA-F_:]*)'
+
+# descriptions maps the field values already seen to their to_string description, shared by all the batches
+BatchField = collections.namedtuple('BatchField', ['name', 'half', 'shift', 'mask', 'to_string', 'descriptions'])
+
+def _batch_field(field):
+    if field.low_bit >= 128:
+        half, offset = _HALF_TAG, 128
+    elif field.low_bit >= 64:
+        half, offset = _HALF_HI, 64
+    else:
+        half, offset = _HALF_LO, 0
+    assert field.high_bit < offset + 64, 'field %s crosses a 64-bit boundary' % field.name
+    return BatchField(field.name, half, np.uint64(field.low_bit - offset), np.uint64((1 << (field.high_bit - field.low_bit + 1)) - 1), field.to_string, {})
+
+MORELLO_SPEC_VERSION_TO_BATCH_FIELDS = {spec_version: [_batch_field(field) for field in fields]
+                                        for spec_version, fields in MORELLO_SPEC_VERSION_TO_FIELDS.items()}
+
+def _np_shl(x, shift):
+    shift = np.asarray(shift, dtype=np.int64)
+    return np.where(shift < 64, np.left_shift(np.asarray(x, dtype=np.uint64), np.clip(shift, 0, 63).astype(np.uint64)), np.uint64(0))
+
+def _np_shr(x, shift):
+    shift = np.asarray(shift, dtype=np.int64)
+    return np.where(shift < 64, np.right_shift(np.asarray(x, dtype=np.uint64), np.clip(shift, 0, 63).astype(np.uint64)), np.uint64(0))
+
+def _np_mask(width):
+    width = np.asarray(width, dtype=np.int64)
+    return np.where(width >= 64, np.uint64(_MASK_64), _np_shl(np.ones(width.shape, dtype=np.uint64), width) - np.uint64(1))
+
+def _np_get_slice_hl(x, high, low):
+    return (x >> np.uint64(low)) & np.uint64((1 << (high - low + 1)) - 1)
+
+# Values wider than 64 bits are returned as object arrays of python ints
+def _np_to_int(hi, lo):
+    return np.where(hi != 0, lo.astype(object) + (1 << 64), lo.astype(object))
+
+def _np_to_string(field, values):
+    uniques, inverse = np.unique(values, return_inverse=True)
+    descriptions = field.descriptions
+    for value in uniques.tolist():
+        if value not in descriptions:
+            descriptions[value] = field.to_string(value)
+    return np.array([descriptions[value] for value in uniques.tolist()], dtype=object)[inverse.reshape(-1)]
+
+# Vectorized Morello beta1 pseudocode CapGetExponent, on the high halves of the capabilities
+def _np_morello_beta1_cap_get_exponent(hi):
+    internal = _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_IE_BIT - 64, _MORELLO_BETA1_CAP_IE_BIT - 64) == 0
+    nexp = (_np_get_slice_hl(hi, _MORELLO_BETA1_CAP_LIMIT_EXP_HI_BIT - 64, _MORELLO_BETA1_CAP_LIMIT_LO_BIT - 64) << \
+                np.uint64(_MORELLO_BETA1_CAP_BASE_EXP_HI_BIT - _MORELLO_BETA1_CAP_BASE_LO_BIT + 1)) | \
+           _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_BASE_EXP_HI_BIT - 64, _MORELLO_BETA1_CAP_BASE_LO_BIT - 64)
+    return np.where(internal, (~nexp & np.uint64(0x3f)).astype(np.int64), 0)
+
+# Vectorized Morello beta1 pseudocode CapGetBounds, also used for beta0 fixed CHERI concentrate whose encoding is the
+# same but whose bounds address is the raw value. Return the base, then bit 64 and bits 63:0 of the limit.
+def _np_morello_beta1_cap_get_bounds(hi, lo, sign_extend_address=True):
+    mw = _MORELLO_BETA1_CAP_MW
+    internal = _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_IE_BIT - 64, _MORELLO_BETA1_CAP_IE_BIT - 64) == 0
+    exp = np.minimum(_np_morello_beta1_cap_get_exponent(hi), _MORELLO_BETA1_CAP_MAX_EXPONENT)
+
+    bottom = np.where(internal,
+                      _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_BASE_HI_BIT - 64, _MORELLO_BETA1_CAP_BASE_MANTISSA_LO_BIT - 64) << np.uint64(3),
+                      _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_BASE_HI_BIT - 64, _MORELLO_BETA1_CAP_BASE_LO_BIT - 64))
+    top = np.where(internal,
+                   _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_LIMIT_HI_BIT - 64, _MORELLO_BETA1_CAP_LIMIT_MANTISSA_LO_BIT - 64) << np.uint64(3),
+                   _np_get_slice_hl(hi, _MORELLO_BETA1_CAP_LIMIT_HI_BIT - 64, _MORELLO_BETA1_CAP_LIMIT_LO_BIT - 64))
+    lcarry = _np_get_slice_hl(top, mw - 3, 0) < _np_get_slice_hl(bottom, mw - 3, 0)
+    top_msbs = (_np_get_slice_hl(bottom, mw - 1, mw - 2) + internal.astype(np.uint64) + lcarry.astype(np.uint64)) & np.uint64(0x3)
+    top = _np_get_slice_hl(top, mw - 3, 0) | (top_msbs << np.uint64(mw - 2))
+
+    if sign_extend_address:
+        value_for_bound = _np_get_slice_hl(lo, _MORELLO_BETA1_CAP_FLAGS_LO_BIT - 1, 0)
+        a = np.where(value_for_bound >> np.uint64(_MORELLO_BETA1_CAP_FLAGS_LO_BIT - 1),
+                     value_for_bound | np.uint64(_MASK_64 ^ ((1 << _MORELLO_BETA1_CAP_FLAGS_LO_BIT) - 1)), value_for_bound)
+    else:
+        a = lo
+
+    base = _np_shl(bottom, exp)
+    limit_lo = _np_shl(top, exp)
+    limit_hi = _np_shr(top, 64 - exp) & np.uint64(1)
+
+    a3 = _np_shr(a, exp + mw - 3) & np.uint64(0x7)
+    b3 = _np_get_slice_hl(bottom, mw - 1, mw - 3)
+    t3 = _np_get_slice_hl(top, mw - 1, mw - 3)
+    r3 = (b3 - np.uint64(1)) & np.uint64(0x7)
+    a_hi = (a3 < r3).astype(np.int64)
+    correction_base = (b3 < r3).astype(np.int64) - a_hi
+    correction_limit = (t3 < r3).astype(np.int64) - a_hi
+
+    # bits 65:exp+MW of the base and limit come from the address, corrected
+    in_range = exp < _MORELLO_BETA1_CAP_MAX_EXPONENT
+    top_lo_bit = exp + mw
+    atop = _np_shr(a, top_lo_bit)
+    top_mask = _np_mask(66 - top_lo_bit)
+    base_top = (atop + correction_base.astype(np.uint64)) & top_mask
+    limit_top = (atop + correction_limit.astype(np.uint64)) & top_mask
+    keep_mask = _np_mask(top_lo_bit)
+    base = np.where(in_range, (base & keep_mask) | _np_shl(base_top, top_lo_bit), base)
+    limit_lo = np.where(in_range, (limit_lo & keep_mask) | _np_shl(limit_top, top_lo_bit), limit_lo)
+    limit_hi = np.where(in_range & (top_lo_bit <= 64), _np_shr(limit_top, 64 - top_lo_bit) & np.uint64(1), limit_hi)
+
+    l2 = (limit_hi << np.uint64(1)) | (limit_lo >> np.uint64(63))
+    b2 = base >> np.uint64(63)
+    flip = (exp < _MORELLO_BETA1_CAP_MAX_EXPONENT - 1) & (((l2 - b2) & np.uint64(0x3)) > 1)
+    limit_hi = limit_hi ^ flip.astype(np.uint64)
+    return (base, limit_hi, limit_lo)
+
+def _np_morello_beta0_fixed_cap_get_bounds(hi, lo):
+    assert (_MORELLO_BETA0_FIXED_CAP_IE_BIT, _MORELLO_BETA0_FIXED_CAP_LIMIT_MANTISSA_LO_BIT, _MORELLO_BETA0_FIXED_CAP_BASE_MANTISSA_LO_BIT, _MORELLO_BETA0_FIXED_CAP_MW) == \
+           (_MORELLO_BETA1_CAP_IE_BIT, _MORELLO_BETA1_CAP_LIMIT_MANTISSA_LO_BIT, _MORELLO_BETA1_CAP_BASE_MANTISSA_LO_BIT, _MORELLO_BETA1_CAP_MW)
+    return _np_morello_beta1_cap_get_bounds(hi, lo, sign_extend_address=False)
+
+# Vectorized Morello beta1 ARRAN 822 CapGetBounds
+def _np_morello_beta1_arran_822_cap_get_bounds(hi, lo):
+    (base, limit_hi, limit_lo) = _np_morello_beta1_cap_get_bounds(hi, lo)
+    # exponents above the maximum are either out of range or the maximum encodeable one, both giving the whole range
+    out_of_range = _np_morello_beta1_cap_get_exponent(hi) > _MORELLO_BETA1_CAP_MAX_EXPONENT
+    assert _MORELLO_BETA1_ARRAN_822_CAP_BOUND_MIN == 0 and _MORELLO_BETA1_ARRAN_822_CAP_BOUND_MAX == 1 << 64
+    return (np.where(out_of_range, np.uint64(0), base),
+            np.where(out_of_range, np.uint64(1), limit_hi),
+            np.where(out_of_range, np.uint64(0), limit_lo))
+
+# Pre CHERI concentrate encodings are decoded one distinct capability at a time
+def _np_scalar_cap_get_bounds(decode_function):
+    def get_bounds(hi, lo):
+        halves, inverse = np.unique(np.stack([hi, lo], axis=1), axis=0, return_inverse=True)
+        bounds = [decode_function((c_hi << 64) | c_lo) for c_hi, c_lo in halves.tolist()]
+        inverse = inverse.reshape(-1)
+        base = np.array([base & _MASK_64 for base, _ in bounds], dtype=np.uint64)[inverse]
+        limit_hi = np.array([limit >> 64 for _, limit in bounds], dtype=np.uint64)[inverse]
+        limit_lo = np.array([limit & _MASK_64 for _, limit in bounds], dtype=np.uint64)[inverse]
+        return (base, limit_hi, limit_lo)
+    return get_bounds
+
+MORELLO_SPEC_VERSION_TO_BATCH_DECODE = {
+    MORELLO_ALPHA1:                        _np_scalar_cap_get_bounds(_morello_cap_get_bounds),
+    MORELLO_BETA0:                         _np_scalar_cap_get_bounds(_morello_cap_get_bounds),
+    MORELLO_BETA0_UPDATE:                  _np_scalar_cap_get_bounds(_morello_beta0_update_cap_get_bounds),
+    MORELLO_BETA0_FIXED_CHERI_CONCENTRATE: _np_morello_beta0_fixed_cap_get_bounds,
+    MORELLO_BETA1:                         _np_morello_beta1_cap_get_bounds,
+    MORELLO_BETA1_ARRAN_822:               _np_morello_beta1_arran_822_cap_get_bounds
+}
+
+# Vectorized get_rep_range, returning RepB, then bit 64 and bits 63:0 of RepT
+def _np_get_rep_range(exp, base):
+    full_range = exp > _MORELLO_BETA1_CAP_MAX_EXPONENT - 2
+    lo_bit = _MORELLO_BETA1_CAP_MW - 3 + exp
+    B3 = _np_shr(base, lo_bit) & _np_mask(_MORELLO_BETA1_CAP_VALUE_HI_BIT - lo_bit)
+    # a B3 of 0 wraps RepB around 2**64, as get_rep_range does for negative RepB
+    RepB = _np_shl(B3 - np.uint64(1), lo_bit)
+    RepT_lo = RepB + _np_shl(np.uint64(1), exp + _MORELLO_BETA1_CAP_MW)
+    RepT_hi = np.where(B3 == 0, False, (RepT_lo < RepB) | (exp + _MORELLO_BETA1_CAP_MW >= 64)).astype(np.uint64)
+    return (np.where(full_range, np.uint64(0), RepB),
+            np.where(full_range, np.uint64(1), RepT_hi),
+            np.where(full_range, np.uint64(0), RepT_lo))
+
+# Vectorized decode_capability of a list of capabilities. Return an OrderedDict of column name to array, holding the
+# value of each field of the specification (followed by its description for the fields having one), then _Base,
+# _RepB, _Limit, _RepT and _exp as keyed by decode_capability.
+def decode_capabilities(capabilities, spec_version=DEFAULT_SPEC_VERSION):
+    if spec_version not in MORELLO_SPEC_VERSIONS:
+        raise ValueError('Unsupported specification version: %s' % spec_version)
+    count = len(capabilities)
+    halves = (np.fromiter((c & _MASK_64 for c in capabilities), dtype=np.uint64, count=count),
+              np.fromiter(((c >> 64) & _MASK_64 for c in capabilities), dtype=np.uint64, count=count),
+              np.fromiter(((c >> 128) & _MASK_64 for c in capabilities), dtype=np.uint64, count=count))
+    (lo, hi, _) = halves
+
+    columns = collections.OrderedDict()
+    for field in MORELLO_SPEC_VERSION_TO_BATCH_FIELDS[spec_version]:
+        values = (halves[field.half] >> field.shift) & field.mask
+        columns[field.name] = values
+        if field.to_string:
+            columns[field.name + '_str'] = _np_to_string(field, values)
+    (base, limit_hi, limit_lo) = MORELLO_SPEC_VERSION_TO_BATCH_DECODE[spec_version](hi, lo)
+    exp = _np_morello_beta1_cap_get_exponent(hi)
+    (RepB, RepT_hi, RepT_lo) = _np_get_rep_range(exp, base)
+    columns['_Base'] = base
+    columns['_RepB'] = RepB
+    columns['_Limit'] = _np_to_int(limit_hi, limit_lo)
+    columns['_RepT'] = _np_to_int(RepT_hi, RepT_lo)
+    columns['_exp'] = exp
+    return columns
+
+# One capability per line, blank lines and '#' comments being skipped
+def read_capabilities(fd):
+    for line_number, line in enumerate(fd, 1):
+        line = line.split('#', 1)[0].strip()
+        if line:
+            yield (line_number, None, int(line, 0))
+
+# Capability register values of tarmac / evs lines, the tag being taken from the 'tag' group of the regex if any
+def extract_capabilities(fd, regex=TARMAC_CAPABILITY_RE):
+    regex = re.compile(regex)
+    for line_number, line in enumerate(fd, 1):
+        for match in regex.finditer(line):
+            groups = match.groupdict()
+            capability = int(re.sub('[_:]', '', groups['value']), 16)
+            if groups.get('tag'):
+                capability |= int(groups['tag']) << 128
+            yield (line_number, groups.get('register'), capability)
@@ -0,0 +1,485 @@
+"""
+helper module building a package out of files spread over several source trees, without staging them.
+
+Source trees are first recorded as entries keyed by their path in the package, an entry recorded again at the same
+path replacing the previous one as successive copies into a directory would. Contents are only read when the package
+is written, either as a gzipped tar archive compressed by blocks on several threads, or as a directory tree. Text
+rewrites registered on an entry are applied on the fly, and identical files are only stored once, as hard links.
+
+Each package holds a manifest, giving the type, mode, size, modification time and sha256 of every entry. Given the
+manifest of a previous package, an archive can be written as a delta of it: it then only holds the new and changed
+entries, along with the manifest listing the paths of the previous package to delete.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+# size of the blocks of the tar stream, each block being compressed on its own into a gzip member
+GZIP_BLOCK_SIZE = 1 << 22
+GZIP_COMPRESS_LEVEL = 6
+
+# size of the chunks read when hashing a file
+HASH_CHUNK_SIZE = 1 << 20
+
+# name of the manifest of a package, at the top of the package
+MANIFEST_NAME = ".package_manifest.json"
+MANIFEST_VERSION = 1
+
+# manifest fields telling whether two entries have the same content
+MANIFEST_CONTENT_FIELDS = ("type", "mode", "sha256", "target")
+
+# manifest fields telling whether a file may have changed since its hash was computed
+MANIFEST_STAT_FIELDS = ("type", "mode", "size", "mtime")
+
+ENTRY_DIR = "dir"
+ENTRY_FILE = "file"
+ENTRY_DATA = "data"
+ENTRY_SYMLINK = "symlink"
+
+class PackageEntry(namedtuple("PackageEntry", "kind source data mode rewrites")):
+    """
+    entry of a package: directory, file copied from L{source}, generated L{data} or symbolic link to L{data}
+
+    @param rewrites: functions applied in turn to the text of the file, or to the generated data
+    """
+    __slots__ = ()
+
+    def __new__(cls, kind, source=None, data=None, mode=None, rewrites=()):
+        return super().__new__(cls, kind, source, data, mode, rewrites)
+
+def read_entry(entry):
+    "return the content of a generated or rewritten file entry as bytes, None for a file copied as is"
+    if entry.kind == ENTRY_DATA:
+        data = entry.data
+    elif entry.kind == ENTRY_FILE and entry.rewrites:
+        with open(entry.source, "r") as fin:
+            data = fin.read()
+    else:
+        return None
+    for rewrite in entry.rewrites:
+        data = rewrite(data)
+    return data.encode() if isinstance(data, str) else data
+
+def hash_file(path):
+    "return the sha256 hex digest of the content of a file"
+    digest = hashlib.sha256()
+    with open(path, "rb") as fin:
+        for chunk in iter(lambda: fin.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class HashingReader:
+    "read-only file object wrapper computing the sha256 of what is read through it"
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.digest = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self.fileobj.read(size)
+        self.digest.update(data)
+        return data
+
+    def hexdigest(self):
+        "return the sha256 hex digest of what has been read so far"
+        return self.digest.hexdigest()
+
+def copy_file(src, dst):
+    "copy file L{src} to L{dst} along with its permissions and times, as C{shutil.copy2} does, returning its sha256"
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        reader = HashingReader(fin)
+        shutil.copyfileobj(reader, fout, HASH_CHUNK_SIZE)
+    shutil.copystat(src, dst)
+    return reader.hexdigest()
+
+def hash_data(data):
+    "return the sha256 hex digest of bytes"
+    return hashlib.sha256(data).hexdigest()
+
+def get_manifest_path(archive):
+    "return the path of the manifest written next to a package archive"
+    for suffix in (".tar.gz", ".tgz"):
+        if archive.endswith(suffix):
+            return archive[:-len(suffix)] + ".manifest.json"
+    return archive + ".manifest.json"
+
+def load_manifest(path):
+    "return the manifest read from file L{path}"
+    with open(path, "r") as fin:
+        manifest = json.load(fin)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError("unsupported manifest version {} in {}".format(manifest.get("version"), path))
+    return manifest
+
+def dump_manifest(manifest):
+    "return the manifest serialized as bytes"
+    return json.dumps(manifest, indent=1, sort_keys=True).encode()
+
+def is_same_content(entry, base_entry):
+    "return True if the manifest entries L{entry} and L{base_entry} (possibly None) have the same content"
+    return base_entry is not None and all(entry.get(field) == base_entry.get(field) for field in MANIFEST_CONTENT_FIELDS)
+
+def is_same_stat(entry, other, fields=MANIFEST_STAT_FIELDS):
+    "return True if the manifest entries L{entry} (possibly None) and L{other} have the same L{fields}"
+    return entry is not None and all(entry.get(field) == other.get(field) for field in fields)
+
+def make_manifest(entries, base=None):
+    """
+    return the manifest of a package holding the manifest L{entries}
+
+    @param base: manifest of the package the package is a delta of, None for a full package; the paths of the base
+                 package that are gone, or whose type changed, are listed as deleted
+    """
+    deleted = []
+    if base is not None:
+        deleted = sorted(path for path, base_entry in base["entries"].items()
+                         if path not in entries or entries[path]["type"] != base_entry["type"])
+    return {"version": MANIFEST_VERSION,
+            "digest": hash_data(json.dumps(entries, sort_keys=True).encode()),
+            "base": base["digest"] if base is not None else None,
+            "deleted": deleted,
+            "entries": entries}
+
+def get_delta_paths(entries, base):
+    """
+    return the set of the paths of the manifest L{entries} that are new or changed since the package of L{base}, the
+    files not hashed yet being considered as changed
+    """
+    return {path for path, entry in entries.items() if not is_same_content(entry, base["entries"].get(path))}
+
+class ParallelGzipWriter:
+    """
+    write-only file object gzipping what is written to L{fileobj}, blocks being compressed concurrently
+
+    Each block is compressed into a gzip member of its own, the concatenation of the members being a valid gzip stream.
+    """
+
+    def __init__(self, fileobj, jobs=None, block_size=GZIP_BLOCK_SIZE, compresslevel=GZIP_COMPRESS_LEVEL):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.compresslevel = compresslevel
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        # bound the number of blocks in flight, so that memory use does not depend on the package size
+        self.max_pending = 2 * (jobs or os.cpu_count() or 1)
+        self.pending = deque()
+        self.buffer = bytearray()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _submit(self, block):
+        "compress a block in the background, writing the blocks already compressed"
+        self.pending.append(self.executor.submit(gzip.compress, block, self.compresslevel))
+        while len(self.pending) > self.max_pending:
+            self.fileobj.write(self.pending.popleft().result())
+
+    def write(self, data):
+        "buffer L{data}, compressing every full block"
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+        return len(data)
+
+    def close(self):
+        "compress the last block and write all the pending blocks"
+        if self.buffer:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        while self.pending:
+            self.fileobj.write(self.pending.popleft().result())
+        self.executor.shutdown()
+
+class PackageBuilder:
+    "entries of a package, written out at once as an archive or a directory tree"
+
+    def __init__(self, root):
+        """
+        @param root: name of the top directory of the package in the archive
+        """
+        self.root = root
+        self.entries = {}
+
+    def add_tree(self, src, dst, symlinks=False, ignore=None, match=None):
+        """
+        record the content of directory L{src} under package path L{dst}
+
+        @param symlinks: record symbolic links as links instead of following them
+        @param ignore: callable(src, names) returning the names to skip, as given to C{shutil.copytree}
+        @param match: callable(names) returning the names of the files to include, files without extension being
+                      always included
+        @raise shutil.Error: with the list of (source, destination, reason) of the entries that could not be read, once
+                             the whole tree has been recorded
+        """
+        dst = os.path.normpath(dst)
+        names = os.listdir(src)
+        ignored_names = ignore(src, names) if ignore is not None else set()
+        matched_names = match(names) if match is not None else None
+
+        self.entries[dst] = PackageEntry(ENTRY_DIR, source=src)
+
+        errors = []
+        for name in names:
+            if name in ignored_names:
+                continue
+            srcname = os.path.join(src, name)
+            dstname = os.path.join(dst, name)
+            try:
+                if symlinks and os.path.islink(srcname):
+                    self.entries[dstname] = PackageEntry(ENTRY_SYMLINK, data=os.readlink(srcname))
+                elif os.path.isdir(srcname):
+                    self.add_tree(srcname, dstname, symlinks, ignore, match)
+                elif matched_names is None or name in matched_names or "." not in name:
+                    if os.path.exists(srcname):
+                        self.entries[dstname] = PackageEntry(ENTRY_FILE, source=srcname)
+            # keep going with the other entries, as shutil.copytree does
+            except shutil.Error as err:
+                errors.extend(err.args[0])
+            except OSError as why:
+                errors.append((srcname, dstname, str(why)))
+        if errors:
+            raise shutil.Error(errors)
+
+    def add_data(self, dst, data, mode=0o644):
+        "record a file of package path L{dst} holding L{data} (str or bytes)"
+        self.entries[os.path.normpath(dst)] = PackageEntry(ENTRY_DATA, data=data, mode=mode)
+
+    def add_symlink(self, dst, target):
+        "record a symbolic link of package path L{dst} pointing to L{target}"
+        self.entries[os.path.normpath(dst)] = PackageEntry(ENTRY_SYMLINK, data=target)
+
+    def rewrite(self, dst, rewrite):
+        """
+        register a function rewriting the text of the file of package path L{dst} when it is written
+
+        @raise FileNotFoundError: if there is no such file in the package
+        """
+        dst = os.path.normpath(dst)
+        entry = self.entries.get(dst)
+        if entry is None or entry.kind not in (ENTRY_FILE, ENTRY_DATA):
+            raise FileNotFoundError("no file {} in the package".format(dst))
+        self.entries[dst] = entry._replace(rewrites=entry.rewrites + (rewrite,))
+
+    def iter_entries(self, prefix):
+        "iterate over the (package path, L{PackageEntry}) of the entries under package path L{prefix}"
+        prefix = os.path.normpath(prefix)
+        for dst, entry in list(self.entries.items()):
+            if dst == prefix or dst.startswith(prefix + os.sep):
+                yield dst, entry
+
+    def add_file(self, src, dst):
+        "record file L{src} as the file of package path L{dst}"
+        self.entries[os.path.normpath(dst)] = PackageEntry(ENTRY_FILE, source=src)
+
+    def get_manifest_entries(self, base_entries=None, jobs=None, lazy=False):
+        """
+        return the dict of package path to manifest entry of all the entries, hashing the files concurrently
+
+        @param base_entries: manifest entries of a previous package, whose hash is reused for the files that have the
+                             same mode, size and modification time
+        @param lazy: only hash the files copied as is that may be identical to another one, i.e. that have the same
+                     size and mode, or to their entry of L{base_entries}, i.e. that kept their size and mode, the other
+                     files being left without sha256, to be hashed while they are written
+        """
+        entries = {}
+        to_hash = []
+        for dst, entry in self.entries.items():
+            if entry.kind == ENTRY_DIR:
+                entries[dst] = {"type": ENTRY_DIR, "mode": os.stat(entry.source).st_mode & 0o7777}
+            elif entry.kind == ENTRY_SYMLINK:
+                entries[dst] = {"type": ENTRY_SYMLINK, "target": entry.data}
+            else:
+                content = read_entry(entry)
+                if content is not None:
+                    mode = os.stat(entry.source).st_mode & 0o7777 if entry.source else entry.mode
+                    entries[dst] = {"type": ENTRY_FILE, "mode": mode, "size": len(content), "sha256": hash_data(content)}
+                    continue
+                stat = os.stat(entry.source)
+                info = {"type": ENTRY_FILE, "mode": stat.st_mode & 0o7777, "size": stat.st_size, "mtime": stat.st_mtime}
+                base_entry = (base_entries or {}).get(dst)
+                if base_entry is not None and "sha256" in base_entry and is_same_stat(base_entry, info):
+                    info["sha256"] = base_entry["sha256"]
+                else:
+                    to_hash.append((dst, entry.source))
+                entries[dst] = info
+
+        if lazy:
+            same_stats = {}
+            for info in entries.values():
+                if "mtime" in info:
+                    same_stats[(info["size"], info["mode"])] = same_stats.get((info["size"], info["mode"]), 0) + 1
+            # a file only touched since the base package must be hashed up front not to be taken as changed
+            to_hash = [(dst, source) for dst, source in to_hash
+                       if (entries[dst]["size"] and same_stats[(entries[dst]["size"], entries[dst]["mode"])] > 1) or
+                       is_same_stat((base_entries or {}).get(dst), entries[dst], ("type", "mode", "size"))]
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for (dst, _), digest in zip(to_hash, executor.map(hash_file, [source for _, source in to_hash])):
+                entries[dst]["sha256"] = digest
+        return entries
+
+    def get_duplicates(self, manifest_entries, paths=None):
+        """
+        return the dict of package path to the package path of the first identical file with the same mode, among the
+        non-empty files copied as is, the files without sha256 (see L{get_manifest_entries} lazy) having no duplicate
+
+        @param manifest_entries: manifest entries of the package, see L{get_manifest_entries}
+        @param paths: only consider the files of these package paths, all of them if None
+        """
+        duplicates = {}
+        first_paths = {}
+        for dst, entry in self.entries.items():
+            if entry.kind != ENTRY_FILE or entry.rewrites or (paths is not None and dst not in paths):
+                continue
+            info = manifest_entries[dst]
+            if not info["size"] or "sha256" not in info:
+                continue
+            # hard links share their permissions, so only files with the same mode can be linked
+            first_path = first_paths.setdefault((info["sha256"], info["mode"]), dst)
+            if first_path != dst:
+                duplicates[dst] = first_path
+        return duplicates
+
+    def _add_to_tar(self, tar, dst, entry, link):
+        """
+        write one entry to the tar stream, as a hard link to package path L{link} if not None
+
+        @return: the sha256 of the file copied as is, computed while it is written, None for the other entries
+        """
+        tarinfo = tarfile.TarInfo(os.path.join(self.root, dst))
+        tarinfo.mtime = time.time()
+
+        if entry.kind == ENTRY_DIR:
+            tarinfo.type = tarfile.DIRTYPE
+            stat = os.stat(entry.source)
+            tarinfo.mode, tarinfo.mtime = stat.st_mode & 0o7777, stat.st_mtime
+            tar.addfile(tarinfo)
+        elif entry.kind == ENTRY_SYMLINK:
+            tarinfo.type = tarfile.SYMTYPE
+            tarinfo.linkname = entry.data
+            tarinfo.mode = 0o777
+            tar.addfile(tarinfo)
+        elif link is not None:
+            tarinfo.type = tarfile.LNKTYPE
+            tarinfo.linkname = os.path.join(self.root, link)
+            stat = os.stat(entry.source)
+            tarinfo.mode, tarinfo.mtime = stat.st_mode & 0o7777, stat.st_mtime
+            tar.addfile(tarinfo)
+        else:
+            content = read_entry(entry)
+            if content is None:
+                with open(entry.source, "rb") as fin:
+                    reader = HashingReader(fin)
+                    tar.addfile(tar.gettarinfo(arcname=tarinfo.name, fileobj=fin), reader)
+                return reader.hexdigest()
+            tarinfo.size = len(content)
+            tarinfo.mode = os.stat(entry.source).st_mode & 0o7777 if entry.source else entry.mode
+            tar.addfile(tarinfo, io.BytesIO(content))
+        return None
+
+    def write_archive(self, output_file, jobs=None, base=None):
+        """
+        write the package as the gzipped tar archive L{output_file}, the archive only appearing once complete
+
+        @param jobs: number of threads hashing and compressing, the number of CPUs if None
+        @param base: manifest of a previous package, only the entries that are new or changed since that package being
+                     written if not None
+        @return: (manifest, number of files stored as hard links to an identical file)
+        """
+        # only the possible duplicates, and for a delta the files that may be unchanged, are hashed up front, the other
+        # files are hashed while they are archived, the manifest being the last member of the archive
+        manifest_entries = self.get_manifest_entries(base["entries"] if base is not None else None, jobs, lazy=True)
+        paths = get_delta_paths(manifest_entries, base) if base is not None else None
+        duplicates = self.get_duplicates(manifest_entries, paths)
+
+        temp_file = output_file + ".tmp"
+        try:
+            with open(temp_file, "wb") as out_fd, ParallelGzipWriter(out_fd, jobs) as gzip_fd:
+                with tarfile.open(fileobj=gzip_fd, mode="w|") as tar:
+                    for dst, entry in self.entries.items():
+                        if paths is None or dst in paths:
+                            digest = self._add_to_tar(tar, dst, entry, duplicates.get(dst))
+                            if digest is not None:
+                                manifest_entries[dst]["sha256"] = digest
+                    manifest = make_manifest(manifest_entries, base)
+                    self._add_to_tar(tar, MANIFEST_NAME, PackageEntry(ENTRY_DATA, data=dump_manifest(manifest), mode=0o644), None)
+            os.replace(temp_file, output_file)
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        return manifest, len(duplicates)
+
+    def materialise(self, out_dir, prefixes=None, link_sources=False):
+        """
+        write the package as a directory tree under L{out_dir}, identical files being hard linked when possible
+
+        @param prefixes: only write the entries under these package paths, all of them if None
+        @param link_sources: write the files copied as is as symbolic links to their source, for a tree that is only
+                             read, e.g. by module files, without copying the files
+        @return: the manifest of the package if it is written as a whole (without L{link_sources}), None otherwise
+        """
+        manifest_entries = None
+        duplicates = {}
+        if prefixes is None and not link_sources:
+            # as for an archive, only the possible duplicates are hashed up front, the other files while they are copied
+            manifest_entries = self.get_manifest_entries(lazy=True)
+            duplicates = self.get_duplicates(manifest_entries)
+        elif prefixes is not None:
+            prefixes = [os.path.normpath(prefix) for prefix in prefixes]
+        directories = []
+        for dst, entry in self.entries.items():
+            if prefixes is not None and not any(dst == prefix or dst.startswith(prefix + os.sep) for prefix in prefixes):
+                continue
+            path = os.path.join(out_dir, dst)
+            if entry.kind == ENTRY_DIR:
+                os.makedirs(path, exist_ok=True)
+                directories.append((entry.source, path))
+                continue
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if entry.kind == ENTRY_SYMLINK:
+                os.symlink(entry.data, path)
+            elif dst in duplicates:
+                try:
+                    os.link(os.path.join(out_dir, duplicates[dst]), path)
+                except OSError:
+                    shutil.copy2(entry.source, path)
+            else:
+                content = read_entry(entry)
+                if content is None and link_sources:
+                    os.symlink(os.path.abspath(entry.source), path)
+                    continue
+                if content is None:
+                    digest = copy_file(entry.source, path)
+                    if manifest_entries is not None:
+                        manifest_entries[dst]["sha256"] = digest
+                    continue
+                with open(path, "wb") as fout:
+                    fout.write(content)
+                if entry.source:
+                    shutil.copymode(entry.source, path)
+                else:
+                    os.chmod(path, entry.mode)
+
+        manifest = None
+        if manifest_entries is not None:
+            manifest = make_manifest(manifest_entries)
+            os.makedirs(out_dir, exist_ok=True)
+            with open(os.path.join(out_dir, MANIFEST_NAME), "wb") as fout:
+                fout.write(dump_manifest(manifest))
+
+        # directory permissions and times last, as writing their content changes them
+        for source, path in reversed(directories):
+            shutil.copystat(source, path)
+        return manifest
@@ -1,33 +1,77 @@
 # pylint: disable=missing-docstring
 
-import sys
-from os import walk, listdir
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from itertools import islice
 
 import yaml
 
+# C accelerated YAML loader, when PyYAML is built with libyaml
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# suffix of the JSON copy of a stats file, read instead of the YAML file when present
+JSON_SIDECAR_SUFFIX = ".json"
+
+# number of stats files sent at once to a worker process
+FILES_PER_TASK = 16
+
+def read_stat_file(file_path):
+    "return the generator statistics of a stats file, read from its JSON sidecar if there is one"
+    sidecar_path = file_path + JSON_SIDECAR_SUFFIX
+    if os.path.isfile(sidecar_path):
+        with open(sidecar_path, "r") as file_in:
+            stats = json.load(file_in)
+    else:
+        with open(file_path, "r") as file_in:
+            stats = yaml.load(file_in, Loader=YAML_LOADER)
+    return (stats or {}).get("generator") or {}
+
+def list_stat_files(dir_path):
+    "return the names of the stats files of a directory, in listing order, JSON sidecars being skipped"
+    names = [entry.name for entry in os.scandir(dir_path) if entry.is_file()]
+    name_set = set(names)
+    return [name for name in names
+            if not (name.endswith(JSON_SIDECAR_SUFFIX) and name[:-len(JSON_SIDECAR_SUFFIX)] in name_set)]
+
+@lru_cache(maxsize=None)
+def get_key_groups(key):
+    "return the groups whose name is part of the statistic L{key}, computed once per key name"
+    return tuple(group for group in StatisticParser.GROUP_LIST if group in key)
+
+def count_groups(stat_dict):
+    "return the dict of group to the sum of the statistics of all the agents belonging to that group"
+    group_counts = {}
+    for agent_stats in stat_dict.values():
+        for key, value in agent_stats.items():
+            for group in get_key_groups(key):
+                group_counts[group] = group_counts.get(group, 0) + value
+    return group_counts
+
+def count_stat_file(file_path):
+    "return the group counts of a stats file, run in the worker processes"
+    return count_groups(read_stat_file(file_path))
+
 class StatisticParser:
     GROUP_LIST = ("WRITE_GRP", "READ_GRP", "MACROS_GRP", "BARRIER_GRP",
                   "PRFM_GRP", "CP_OP_GRP", "INV_ALL_GRP", "D_CLEAN_INV_GRP",
                   "CP15_RD_GRP", "CP15_WR_GRP", "PWR_GRP", "L2_PARAM_GRP",
                   "NB_CAT_GEN")
 
-    def __init__(self, stat_dir_path, summary_dir_path):
+    def __init__(self, stat_dir_path, summary_dir_path, jobs=None):
         self.stat_dir_path = stat_dir_path
         self.result_dict = {}
         self.prof_result_dict = {}
         self.stat_dict = {}
         self.summary_dir_path = summary_dir_path
+        self.jobs = jobs
 
     def read_yaml_stat_file(self, file_path):
-        with open(file_path, "r") as file_in:
-            generator = yaml.load(file_in).get("generator")
-            if generator:
-                self.stat_dict = generator
-
-    def add_agents(self, grp_cat, key):
-        if self.result_dict.get(grp_cat) is None:
-            self.result_dict[grp_cat] = 0
-        self.result_dict[grp_cat] += self.stat_dict[key[0]][key[1]]
+        generator = read_stat_file(file_path)
+        if generator:
+            self.stat_dict = generator
 
     def normalize_results(self):
         for group in self.GROUP_LIST:
@@ -65,18 +109,11 @@ class StatisticParser:
             for key in list(self.prof_result_dict):
                 fh.write("{} {}\n".format(key, self.prof_result_dict[key]))
 
-    def generate_test_profile(self):
-        agent_l = list(self.stat_dict)
-        key_l = []
-        for agent in agent_l:
-            key_l += [(agent, key) for key in self.stat_dict[agent]]
-        print(key_l)
+    def generate_test_profile(self, group_counts=None):
+        if group_counts is None:
+            group_counts = count_groups(self.stat_dict)
         for group in self.GROUP_LIST:
-            for key in key_l:
-                if key[1].find(group) != -1:
-                    self.add_agents(group, key)
-            if self.result_dict.get(group) is None:
-                self.result_dict[group] = 0
+            self.result_dict[group] = self.result_dict.get(group, 0) + group_counts.get(group, 0)
         self.normalize_results()
         self.extract_profile()
 
@@ -86,18 +123,31 @@ class StatisticParser:
         self.stat_dict = {}
 
     def generate_global_stat(self):
-        directories_l = [direct[0] for direct in walk(self.stat_dir_path) if direct[0] != self.stat_dir_path]
-        for direct in directories_l:
-            file_name_l = listdir(direct)
-            self.result_dict["TEST_CONFIG_NB"] = len(file_name_l)
-            for fil in file_name_l:
-                self.read_yaml_stat_file(direct+"/"+fil)
-                self.generate_test_profile()
-                self.stat_dict = {}
-            self.write_summary(self.summary_dir_path + "/" + direct.split("/")[-1] + ".stats")
-            self.clean_parsing_dir()
+        directories_l = [direct[0] for direct in os.walk(self.stat_dir_path) if direct[0] != self.stat_dir_path]
+        file_paths_l = [[direct + "/" + fil for fil in list_stat_files(direct)] for direct in directories_l]
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            # files are parsed concurrently, their counts coming back in order to be accumulated directory by directory
+            group_counts_it = executor.map(count_stat_file,
+                                           [path for file_paths in file_paths_l for path in file_paths],
+                                           chunksize=FILES_PER_TASK)
+            for direct, file_paths in zip(directories_l, file_paths_l):
+                self.result_dict["TEST_CONFIG_NB"] = len(file_paths)
+                for group_counts in islice(group_counts_it, len(file_paths)):
+                    self.generate_test_profile(group_counts)
+                self.write_summary(self.summary_dir_path + "/" + direct.split("/")[-1] + ".stats")
+                self.clean_parsing_dir()
+
+def get_args():
+    "parse the command line arguments"
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stat_dir", help="directory holding one subdirectory of stats files per test configuration")
+    parser.add_argument("summary_dir", help="directory where the .stats profile summary of each configuration is written")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="number of processes parsing the stats files (default: number of CPUs)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    stat_dir, summary_dir = sys.argv[1], sys.argv[2]
-    stat_parser = StatisticParser(stat_dir, summary_dir)
+    args = get_args()
+    stat_parser = StatisticParser(args.stat_dir, args.summary_dir, args.jobs)
     stat_parser.generate_global_stat()
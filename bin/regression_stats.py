@@ -0,0 +1,185 @@
+"""
+helper module to keep the statistics of all the tests of a regression in JSON lines files.
+
+Each test writes its statistics as a single JSON line to its own shard file, C{shards/<test>.jsonl}, so that the
+concurrent jobs of a regression never write to the same file (the regression directory being usually on NFS, where
+file locking cannot be relied upon). A shard is written to a temporary file first and then renamed, so that readers
+never see a partial shard.
+
+Readers merge the shards with the compacted store C{stats.jsonl}, the tests being keyed by test name and a shard
+replacing the compacted line of the same test. L{compact_stats} folds the shards into the compacted store once the
+regression is over (genasm_mp_regr submits C{genasm_mp_stats --compact} as a job depending on the test job array), so
+that queries of a finished regression read a single file.
+
+Nested statistics are looked up with dotted names (e.g. C{agents.cpu0.nb_instructions_generated}).
+"""
+
+import fnmatch
+import json
+import os
+import re
+
+STATS_STORE_NAME = "stats.jsonl"
+STATS_SHARD_DIR = "shards"
+STATS_SHARD_SUFFIX = ".jsonl"
+STATS_KEY = "test_name"
+
+# filter of a query, as COLUMN OP VALUE
+FILTER_RE = re.compile(r"^\s*(?P<column>[^=<>!~]+?)\s*(?P<op><=|>=|!=|=|<|>|~)\s*(?P<value>.*?)\s*$")
+
+# filter operators, with their python predicate (~ being a glob pattern match of the value as a string)
+FILTER_OPS = {"=": lambda value, ref: value == ref,
+              "!=": lambda value, ref: value != ref,
+              "<": lambda value, ref: value < ref,
+              "<=": lambda value, ref: value <= ref,
+              ">": lambda value, ref: value > ref,
+              ">=": lambda value, ref: value >= ref,
+              "~": lambda value, ref: fnmatch.fnmatchcase(str(value), ref)}
+
+def flatten_stats(stats, prefix=""):
+    "return the flat dictionary of dotted name to value of a (nested) statistics dictionary"
+    row = {}
+    for key, value in stats.items():
+        name = prefix + str(key)
+        if isinstance(value, dict):
+            row.update(flatten_stats(value, name + "."))
+        else:
+            row[name] = value
+    return row
+
+def get_cells(stats, items):
+    """
+    return the table cells of the statistic L{items} of a test, as strings, C{?} for the missing ones
+
+    Top level items are printed as they are, nested dictionaries included, nested items being looked up by their
+    dotted name.
+    """
+    row = None
+    cells = []
+    for item in items:
+        if item in stats:
+            cells.append(str(stats[item]))
+            continue
+        if row is None:
+            row = flatten_stats(stats)
+        cells.append(str(row[item]) if item in row else u"?")
+    return cells
+
+def get_shard_dir(stats_dir):
+    "return the directory of the statistics shards of the statistics directory L{stats_dir}"
+    return os.path.join(stats_dir, STATS_SHARD_DIR)
+
+def has_stats(stats_dir):
+    "return True if the statistics directory L{stats_dir} holds a compacted store or shards"
+    return os.path.isfile(os.path.join(stats_dir, STATS_STORE_NAME)) or os.path.isdir(get_shard_dir(stats_dir))
+
+def write_file(path, text):
+    "write L{text} to L{path} through a temporary file renamed over it"
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "w") as fout:
+        fout.write(text)
+    os.replace(tmp_path, path)
+
+def write_stats_shard(stats_dir, name, stats):
+    "write the statistics of one test to its shard L{name} of the statistics directory L{stats_dir}"
+    if STATS_KEY not in stats:
+        raise ValueError("statistics without {}".format(STATS_KEY))
+    shard_dir = get_shard_dir(stats_dir)
+    os.makedirs(shard_dir, exist_ok=True)
+    write_file(os.path.join(shard_dir, name + STATS_SHARD_SUFFIX), json.dumps(stats, sort_keys=True) + "\n")
+
+def read_lines(path):
+    "iterate over the statistics of a JSON lines file, skipping the lines that cannot be parsed"
+    with open(path) as fin:
+        for line in fin:
+            try:
+                stats = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(stats, dict):
+                yield stats
+
+def get_shard_paths(stats_dir):
+    "return the list of the shard files of the statistics directory L{stats_dir}"
+    shard_dir = get_shard_dir(stats_dir)
+    if not os.path.isdir(shard_dir):
+        return []
+    return [os.path.join(shard_dir, name) for name in os.listdir(shard_dir) if name.endswith(STATS_SHARD_SUFFIX)]
+
+def merge_stats(stats_dir, shard_paths):
+    "return the dictionary of test name to statistics of the compacted store, updated with the L{shard_paths}"
+    merged = {}
+    store_path = os.path.join(stats_dir, STATS_STORE_NAME)
+    paths = ([store_path] if os.path.isfile(store_path) else []) + shard_paths
+    for path in paths:
+        try:
+            for stats in read_lines(path):
+                merged[stats.get(STATS_KEY)] = stats
+        except FileNotFoundError:
+            # shard replaced by a test run again while listing them
+            continue
+    return merged
+
+def iter_stats(stats_dir, filters=()):
+    """
+    iterate over the statistics of the tests of the statistics directory L{stats_dir} fulfilling all the L{filters}
+
+    @param filters: list of L{StatsFilter}
+    """
+    for stats in merge_stats(stats_dir, get_shard_paths(stats_dir)).values():
+        if filters:
+            row = flatten_stats(stats)
+            if not all(stats_filter.matches(row) for stats_filter in filters):
+                continue
+        yield stats
+
+def compact_stats(stats_dir):
+    """
+    fold the shards of the statistics directory L{stats_dir} into its compacted store and remove them, returning the
+    number of folded shards
+
+    A test run again while compacting may lose its new statistics, so only compact once the regression is over.
+    """
+    shard_paths = get_shard_paths(stats_dir)
+    merged = merge_stats(stats_dir, shard_paths)
+    write_file(os.path.join(stats_dir, STATS_STORE_NAME),
+               "".join(json.dumps(stats, sort_keys=True) + "\n" for stats in merged.values()))
+    for path in shard_paths:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+    return len(shard_paths)
+
+def parse_value(value):
+    "return a filter value as an int or float if it is a number, as a string otherwise"
+    for value_type in (int, float):
+        try:
+            return value_type(value)
+        except ValueError:
+            pass
+    return value
+
+class StatsFilter:
+    "COLUMN OP VALUE condition on the statistics of a test"
+
+    def __init__(self, text):
+        """
+        @param text: condition, OP being one of =, !=, <, <=, >, >= or ~ (glob pattern match)
+        """
+        match = FILTER_RE.match(text)
+        if match is None:
+            raise ValueError("invalid filter {!r}, expected COLUMN OP VALUE".format(text))
+        self.column = match.group("column")
+        self.op = match.group("op")
+        self.value = match.group("value") if self.op == "~" else parse_value(match.group("value"))
+
+    def matches(self, row):
+        "return True if the flattened statistics L{row} fulfill the condition, a missing column never matching"
+        value = row.get(self.column)
+        if value is None:
+            return False
+        try:
+            return FILTER_OPS[self.op](value, self.value)
+        except TypeError:
+            return False